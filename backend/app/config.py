@@ -1,5 +1,6 @@
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Dict
 import os
 from dotenv import load_dotenv
 
@@ -26,10 +27,89 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 10  # A just-rotated refresh token is not treated as stolen within this
     ENCRYPTION_KEY: str
+    ENCRYPTION_OLD_KEYS: str = ""  # Comma-separated retired keys, still accepted for decryption
+    ENCRYPTION_WORKERS: int = 4
+    ENCRYPTION_OFFLOAD_THRESHOLD: int = 500  # Batches this large run in worker threads
+    BLIND_INDEX_KEY: str = ""  # Derived from ENCRYPTION_KEY when empty
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_LIMIT: int = 64
+    LAST_LOGIN_FLUSH_SECONDS: int = 10
     
-    # OpenAI
+    # Caching
+    USER_CACHE_TTL_SECONDS: int = 30  # Also the longest a deactivation on another worker goes unnoticed
+    USER_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_MAX_SIZE: int = 50000
+    TOKEN_REVOCATION_SYNC_SECONDS: int = 5  # Logouts on another worker take effect within this
+    CORRELATION_CACHE_TTL_SECONDS: int = 3600
+    CORRELATION_CACHE_MAX_SIZE: int = 5000
+    FORECAST_CACHE_TTL_SECONDS: int = 6 * 3600
+    FORECAST_CACHE_MAX_SIZE: int = 2000
+    
+    # OpenAI / LLM Providers
     OPENAI_API_KEY: str
+    LLM_PROVIDER: str = "openai"  # Default provider: openai or local
+    LOCAL_LLM_BASE_URL: str = "http://127.0.0.1:8001/v1"  # OpenAI-compatible server, e.g. app.mock_llm_server
+    AI_ROUTE_MODELS: Dict[str, str] = {  # "model" or "provider:model" per route
+        "default": "gpt-4o-mini",
+        "insights": "gpt-4o-mini",
+        "batch_insights": "gpt-4o-mini",
+        "symptom_advice": "gpt-3.5-turbo",
+        "chat": "gpt-3.5-turbo",
+        "chat_summary": "gpt-3.5-turbo"
+    }
+    AI_MAX_CONCURRENCY: int = 32
+    AI_ROUTE_CONCURRENCY: Dict[str, int] = {
+        "insights": 8,
+        "batch_insights": 4,  # Kept below "insights" so panel runs don't starve interactive requests
+        "symptom_advice": 16,
+        "chat": 16
+    }
+    AI_ROUTE_DEFAULT_CONCURRENCY: int = 8
+    AI_ATTEMPT_TIMEOUT_SECONDS: float = 20.0
+    AI_DEADLINE_SECONDS: float = 45.0
+    AI_STREAM_IDLE_SECONDS: float = 15.0  # Longest gap allowed between streamed chunks
+    AI_MAX_RETRIES: int = 2
+    AI_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    AI_RETRY_MAX_DELAY_SECONDS: float = 4.0
+    AI_BREAKER_FAILURE_THRESHOLD: int = 5
+    AI_BREAKER_RESET_SECONDS: float = 30.0
+    CHAT_RECENT_MESSAGES: int = 6  # Verbatim messages kept per chat session / sent per turn
+    CHAT_SUMMARY_MAX_WORDS: int = 150
+    AI_MODEL_PRICES: Dict[str, List[float]] = {  # USD per 1M [prompt, completion] tokens, for cost estimates
+        "gpt-4o-mini": [0.15, 0.60],
+        "gpt-4o": [2.50, 10.00],
+        "gpt-3.5-turbo": [0.50, 1.50]
+    }
+    AI_TELEMETRY_FLUSH_SECONDS: int = 30
+    AI_TELEMETRY_RETENTION_DAYS: int = 90
+    CORRELATION_MIN_SAMPLES: int = 10  # Days with both values needed before a pair is reported
+    CORRELATION_SIGNIFICANCE: float = 0.05  # False discovery rate across all tested pairs
+    CORRELATION_MAX_LAG_DAYS: int = 7
+    CORRELATION_MAX_DAYS: int = 730  # Longest history analyzed per request
+    FORECAST_MIN_SAMPLES: int = 5  # Logged values needed before a field is forecast
+    FORECAST_MAX_HORIZON_DAYS: int = 90
+    RISK_WINDOW_DAYS: int = 14  # Recent days of logs scored
+    RISK_WORKERS: int = 0  # Scoring processes (0 = one per CPU)
+    RISK_BATCH_SIZE: int = 200  # Patients per worker task
+    RISK_CURSOR_BATCH_SIZE: int = 2000
+    RISK_SCORING_INTERVAL_HOURS: int = 24  # 0 disables scheduled scoring
+    BATCH_INSIGHT_CONCURRENCY: int = 4  # Patients processed at once per batch job
+    BATCH_INSIGHT_LEASE_SECONDS: int = 120  # A worker's claim on a job lapses if not renewed within this
+    AI_LOG_TOKEN_BUDGET: int = 1200  # Max prompt tokens spent on per-day log rows
+    AI_PREVIOUS_INSIGHT_MAX_CHARS: int = 1500  # Summary of the last insight sent with incremental analyses
+    ADVICE_CACHE_TTL_HOURS: int = 24 * 7
+    ADVICE_CACHE_SYNC_SECONDS: int = 60  # Advice stored by another worker is reused here within this
+    ADVICE_CACHE_SIMILARITY: float = 0.85  # TF-IDF cosine needed to reuse another phrasing
+    ADVICE_CACHE_TOKEN_SIMILARITY: float = 0.8  # Every word on each side must match a word on the other this closely
+    
+    # Pagination
+    PAGE_MAX_LIMIT: int = 100  # Largest page any list endpoint returns
+    
+    # Health Logs
+    MAX_BULK_LOGS: int = 500  # Entries accepted per POST /api/logs/bulk
+    EXPORT_BATCH_SIZE: int = 500  # Cursor batch and rows per streamed chunk for exports
     
     # File Upload
     MAX_FILE_SIZE: int = 10485760  # 10MB
@@ -47,6 +127,14 @@ class Settings(BaseSettings):
     ADMIN_EMAIL: str
     ADMIN_PASSWORD: str
     
+    @field_validator("AI_ROUTE_MODELS")
+    @classmethod
+    def keep_default_route(cls, routes: Dict[str, str]) -> Dict[str, str]:
+        """Overrides that omit "default" fall back to the built-in default model"""
+        if not routes.get("default"):
+            routes = {**routes, "default": cls.model_fields["AI_ROUTE_MODELS"].default["default"]}
+        return routes
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
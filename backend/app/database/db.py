@@ -22,11 +22,17 @@ class Database:
             from app.models.report_model import HealthReport
             from app.models.healthlog_model import HealthLog
             from app.models.insight_model import HealthInsight
+            from app.models.token_model import RefreshToken, RevokedToken
+            from app.models.advice_model import SymptomAdvice
+            from app.models.chat_model import ChatSession
+            from app.models.batch_job_model import InsightBatchJob
+            from app.models.telemetry_model import LLMUsage
+            from app.models.forecast_model import ForecastModel
             
             # Initialize beanie with models
             await init_beanie(
                 database=cls.client[settings.DATABASE_NAME],
-                document_models=[User, HealthReport, HealthLog, HealthInsight]
+                document_models=[User, HealthReport, HealthLog, HealthInsight, RefreshToken, RevokedToken, SymptomAdvice, ChatSession, InsightBatchJob, LLMUsage, ForecastModel]
             )
             
             logger.info("Connected to MongoDB successfully!")
@@ -0,0 +1,124 @@
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.models.report_model import HealthReport
+from app.models.user_model import User
+from app.utils.encryption_utils import reveal, seal
+
+BACKFILL_BATCH_SIZE = 500
+
+
+async def _backfill(collection, projection: dict, compute) -> int:
+    """Apply compute's $set to every document it returns one for"""
+    operations = []
+    updated = 0
+    
+    async for document in collection.find({}, projection):
+        changes = compute(document)
+        if changes is None:
+            continue
+        
+        operations.append(UpdateOne({"_id": document["_id"]}, {"$set": changes}))
+        
+        if len(operations) >= BACKFILL_BATCH_SIZE:
+            await collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+    
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+        updated += len(operations)
+    
+    return updated
+
+
+def _is_plaintext(value: Optional[str]) -> bool:
+    return bool(value) and reveal(value) == value
+
+
+def _seal_report(report: dict) -> Optional[dict]:
+    diagnosis = report.get("diagnosis")
+    medications = report.get("medications") or []
+    
+    if not _is_plaintext(diagnosis) and not any(_is_plaintext(m) for m in medications):
+        return None
+    
+    diagnosis, diagnosis_index = seal(diagnosis)
+    sealed = [seal(m) for m in medications]
+    
+    return {
+        "diagnosis": diagnosis,
+        "diagnosis_index": diagnosis_index,
+        "medications": [ciphertext for ciphertext, _ in sealed],
+        "medication_index": [index for _, index in sealed if index]
+    }
+
+
+def _seal_user(user: dict) -> Optional[dict]:
+    if not _is_plaintext(user.get("phone")):
+        return None
+    
+    phone, phone_index = seal(user["phone"])
+    return {"phone": phone, "phone_index": phone_index}
+
+
+async def encrypt_sensitive_fields() -> dict:
+    """Encrypt plaintext diagnosis, medications and phone values and index them (idempotent)"""
+    reports = await _backfill(
+        HealthReport.get_motor_collection(),
+        {"diagnosis": 1, "medications": 1},
+        _seal_report
+    )
+    users = await _backfill(
+        User.get_motor_collection(),
+        {"phone": 1},
+        _seal_user
+    )
+    
+    return {"reports": reports, "users": users}
+
+
+async def run_once(name: str, migration: Callable[[], Awaitable[dict]]) -> Optional[dict]:
+    """Run a migration unless another worker has claimed or applied it; None if skipped"""
+    applied = User.get_motor_collection().database["migrations"]
+    
+    try:
+        await applied.insert_one({"_id": name, "status": "running", "started_at": datetime.utcnow()})
+    except DuplicateKeyError:
+        return None
+    
+    try:
+        result = await migration()
+    except Exception:
+        # Release the claim so the next start retries
+        await applied.delete_one({"_id": name})
+        raise
+    
+    await applied.update_one(
+        {"_id": name},
+        {"$set": {"status": "applied", "applied_at": datetime.utcnow(), "result": result}}
+    )
+    return result
+
+
+if __name__ == "__main__":
+    # Run manually (always re-runs; safe to repeat): python -m app.database.migrations
+    import asyncio
+    from app.database.db import db
+    
+    async def main():
+        await db.connect_db()
+        try:
+            result = await encrypt_sensitive_fields()
+            await User.get_motor_collection().database["migrations"].update_one(
+                {"_id": "encrypt_sensitive_fields"},
+                {"$set": {"status": "applied", "applied_at": datetime.utcnow(), "result": result}},
+                upsert=True
+            )
+            print(f"Sensitive fields encrypted and indexed: {result}")
+        finally:
+            await db.close_db()
+    
+    asyncio.run(main())
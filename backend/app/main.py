@@ -6,7 +6,22 @@ import uvicorn
 
 from app.config import settings
 from app.database.db import db
+from app.database.migrations import run_once, encrypt_sensitive_fields
 from app.services.auth_service import AuthService
+from app.services.login_tracker_service import LoginTrackerService
+from app.services.token_revocation_service import TokenRevocationService
+from app.utils.role_utils import user_cache
+from app.utils.auth_utils import shutdown_password_executor, token_cache
+from app.utils.encryption_utils import shutdown_encryption_executor
+from app.utils.token_utils import load_encoding
+from app.services.ai_service import ai_singleflight
+from app.services.llm_provider import breakers as ai_breakers
+from app.services.advice_cache_service import AdviceCacheService
+from app.services.correlation_service import correlation_cache
+from app.services.forecast_service import forecast_cache
+from app.services.batch_insight_service import BatchInsightService
+from app.services.telemetry_service import LLMTelemetryService
+from app.services.risk_service import RiskService
 
 # Import all routes
 from app.routes.auth_routes import router as auth_router
@@ -14,6 +29,7 @@ from app.routes.report_routes import router as report_router
 from app.routes.healthlog_routes import router as healthlog_router
 from app.routes.doctor_routes import router as doctor_router
 from app.routes.ai_routes import router as ai_router
+from app.routes.admin_routes import router as admin_router
 
 
 # Lifespan context manager for startup/shutdown
@@ -33,6 +49,44 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Warning: Error creating admin user: {e}")
     
+    # Encrypt and index reports and users written before encryption (once, by one worker)
+    try:
+        migrated = await run_once("encrypt_sensitive_fields", encrypt_sensitive_fields)
+        if migrated is not None:
+            print(f"Encrypted sensitive fields: {migrated}")
+    except Exception as e:
+        print(f"Warning: Error encrypting sensitive fields: {e}")
+    
+    # Load tokens revoked by logouts that are still unexpired
+    try:
+        await TokenRevocationService.sync()
+    except Exception as e:
+        print(f"Warning: Error loading revoked tokens: {e}")
+    
+    # Load the prompt tokenizer off the event loop (may download on first run)
+    await load_encoding()
+    
+    # Load cached symptom advice
+    try:
+        await AdviceCacheService.load()
+    except Exception as e:
+        print(f"Warning: Error loading symptom advice cache: {e}")
+    
+    # Start background writers
+    LoginTrackerService.start()
+    TokenRevocationService.start()
+    AdviceCacheService.start()
+    LLMTelemetryService.start()
+    RiskService.start()
+    
+    # Resume unfinished batch insight jobs
+    try:
+        resumed = await BatchInsightService.resume_jobs()
+        if resumed:
+            print(f"Resumed {resumed} insight batch job(s)")
+    except Exception as e:
+        print(f"Warning: Error resuming insight batch jobs: {e}")
+    
     print("=" * 50)
     print("Application started successfully!")
     print(f"API Docs: http://{settings.HOST}:{settings.PORT}/docs")
@@ -45,7 +99,15 @@ async def lifespan(app: FastAPI):
     print("\n" + "=" * 50)
     print("Shutting down application...")
     print("=" * 50)
+    await BatchInsightService.stop()
+    await LoginTrackerService.stop()
+    await TokenRevocationService.stop()
+    await AdviceCacheService.stop()
+    await LLMTelemetryService.stop()
+    await RiskService.stop()
     await db.close_db()
+    shutdown_password_executor()
+    shutdown_encryption_executor()
     print("Shutdown complete")
 
 
@@ -79,6 +141,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Keyset pagination cursor on list endpoints
 )
 
 # Mount static files
@@ -90,6 +153,7 @@ app.include_router(report_router)
 app.include_router(healthlog_router)
 app.include_router(doctor_router)
 app.include_router(ai_router)
+app.include_router(admin_router)
 
 
 @app.get("/", tags=["Root"])
@@ -108,7 +172,8 @@ def root():
             "health_reports": "/api/reports",
             "health_logs": "/api/logs",
             "doctor_access": "/api/doctor",
-            "ai_insights": "/api/ai"
+            "ai_insights": "/api/ai",
+            "admin": "/api/admin"
         },
         "quick_start": {
             "1": "Register: POST /api/auth/register",
@@ -150,6 +215,17 @@ async def get_stats():
             "total_users": total_users,
             "total_health_reports": total_reports,
             "total_health_logs": total_logs,
+            "caches": {
+                "users": user_cache.stats(),
+                "tokens": token_cache.stats(),
+                "symptom_advice": AdviceCacheService.stats(),
+                "correlations": correlation_cache.stats(),
+                "forecast_models": forecast_cache.stats()
+            },
+            "ai": {
+                "circuit_breakers": {name: breaker.stats() for name, breaker in ai_breakers.items()},
+                "coalesced_requests": ai_singleflight.stats()
+            },
             "api_version": settings.APP_VERSION
         }
     except Exception as e:
@@ -0,0 +1,143 @@
+"""
+Local OpenAI-compatible chat completion stub for offline load testing.
+
+Run:  python -m app.mock_llm_server
+Then: LLM_PROVIDER=local (or AI_ROUTE_MODELS entries like "local:mock-model")
+
+Behaviour is configured with environment variables:
+  MOCK_LLM_PORT               port to listen on (default 8001)
+  MOCK_LLM_LATENCY_MS         delay before the first token (default 300)
+  MOCK_LLM_TOKENS_PER_SECOND  generation speed after the first token (default 50)
+  MOCK_LLM_ERROR_RATE         fraction of requests that fail (default 0)
+  MOCK_LLM_ERROR_STATUS       HTTP status used for injected errors (default 500)
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+import uvicorn
+
+LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "300"))
+TOKENS_PER_SECOND = float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND", "50"))
+ERROR_RATE = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+ERROR_STATUS = int(os.getenv("MOCK_LLM_ERROR_STATUS", "500"))
+
+app = FastAPI(title="Mock LLM Server")
+
+
+def _reply_for(messages: list) -> str:
+    """Deterministic reply shaped like what each AIService prompt asks for"""
+    prompt = messages[-1]["content"] if messages else ""
+    seed = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16)
+    
+    if '"trends"' in prompt:
+        return json.dumps({
+            "trends": {"overall": f"Stable with minor variation (sample {seed % 100})"},
+            "correlations": {"sleep_and_headache": "Shorter sleep precedes headaches"},
+            "recommendations": ["Keep a consistent sleep schedule", "Drink 2-3 liters of water daily", "Take short walks"],
+            "alerts": {}
+        })
+    
+    if '"causes"' in prompt:
+        return json.dumps({
+            "causes": ["Dehydration", "Stress", "Lack of sleep"],
+            "remedies": ["Rest", "Hydrate", "Over-the-counter pain relief if appropriate"],
+            "when_to_see_doctor": ["Symptoms last more than 3 days", "Severe or sudden onset"],
+            "prevention": ["Regular sleep", "Balanced diet"]
+        })
+    
+    return (
+        "Thanks for sharing that. Staying hydrated, resting well and keeping a symptom diary can help. "
+        "Please consult a healthcare professional if things get worse. "
+        f"(mock reply {seed % 1000})"
+    )
+
+
+def _tokens(text: str) -> list:
+    """Split text into word-sized pseudo tokens, keeping whitespace"""
+    words = text.split(" ")
+    return [w + " " for w in words[:-1]] + [words[-1]]
+
+
+def _usage(messages: list, completion_tokens: int) -> dict:
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "mock-model")
+    messages = body.get("messages", [])
+    
+    if random.random() < ERROR_RATE:
+        return JSONResponse(
+            status_code=ERROR_STATUS,
+            content={"error": {"message": "Injected mock error", "type": "server_error"}}
+        )
+    
+    tokens = _tokens(_reply_for(messages))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    token_delay = 1 / TOKENS_PER_SECOND if TOKENS_PER_SECOND > 0 else 0
+    
+    await asyncio.sleep(LATENCY_MS / 1000)
+    
+    if not body.get("stream"):
+        await asyncio.sleep(token_delay * len(tokens))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop"
+            }],
+            "usage": _usage(messages, len(tokens))
+        }
+    
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+    
+    def chunk(delta: dict, finish_reason=None, usage=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else []
+        }
+        if usage is not None:
+            payload["usage"] = usage
+        return f"data: {json.dumps(payload)}\n\n"
+    
+    async def stream():
+        yield chunk({"role": "assistant", "content": ""})
+        for token in tokens:
+            yield chunk({"content": token})
+            await asyncio.sleep(token_delay)
+        yield chunk({}, finish_reason="stop")
+        if include_usage:
+            yield chunk(None, usage=_usage(messages, len(tokens)))
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": "mock-model", "object": "model", "owned_by": "local"}]}
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("MOCK_LLM_PORT", "8001")))
@@ -0,0 +1,29 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from datetime import datetime
+
+
+class SymptomAdvice(Document):
+    """Cached AI advice for a normalized symptom and severity"""
+    
+    # Cache Key
+    normalized_symptom: str
+    severity: str
+    
+    # Cached Response
+    advice: str
+    ai_model_used: str = "gpt-3.5-turbo"
+    
+    # Metadata
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)  # Other workers pick up changes by this
+    expires_at: datetime
+    
+    class Settings:
+        name = "symptom_advice_cache"
+        indexes = [
+            IndexModel([("normalized_symptom", ASCENDING), ("severity", ASCENDING)], unique=True),
+            IndexModel([("updated_at", ASCENDING)]),
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0)  # Mongo purges expired advice
+        ]
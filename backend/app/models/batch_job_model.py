@@ -0,0 +1,57 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from typing import Optional, List, Dict
+from datetime import datetime
+from enum import Enum
+
+
+class JobStatus(str, Enum):
+    """Batch job states"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class InsightBatchJob(Document):
+    """Insight generation run over a doctor's whole patient panel"""
+    
+    # Owner Info
+    doctor_id: str = Field(..., index=True)
+    
+    # Work
+    patient_ids: List[str] = Field(default_factory=list)
+    days: int = 30  # Recent logs analyzed per patient
+    status: JobStatus = Field(default=JobStatus.PENDING)
+    active: bool = True  # Cleared when the job finishes (at most one active job per doctor)
+    
+    # Progress (updated atomically per patient so a restart resumes where it stopped)
+    processed_patient_ids: List[str] = Field(default_factory=list)
+    generated_count: int = 0  # New insights persisted
+    skipped_count: int = 0  # Unchanged data or no logs
+    failed: Dict[str, str] = Field(default_factory=dict)  # patient_id -> error
+    
+    # Claim (only the owning worker process runs the job while its lease is live)
+    owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    
+    # Timing
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    processing_seconds: float = 0.0  # Active run time, summed across restarts
+    
+    class Settings:
+        name = "insight_batch_jobs"
+        indexes = [
+            "doctor_id",
+            "status",
+            ("doctor_id", "created_at"),  # Compound index
+            IndexModel(
+                [("doctor_id", ASCENDING), ("active", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"active": True},
+                name="one_active_job_per_doctor"
+            )
+        ]
@@ -0,0 +1,28 @@
+from beanie import Document
+from pydantic import Field
+from typing import Optional, List, Dict
+from datetime import datetime
+
+
+class ChatSession(Document):
+    """Server-side AI chat session with a rolling summary"""
+    
+    # Owner Info
+    user_id: str = Field(..., index=True)
+    
+    # Conversation State
+    summary: Optional[str] = None  # Compressed summary of turns no longer kept verbatim
+    recent_messages: List[Dict] = Field(default_factory=list)  # Latest turns, oldest first
+    turn_count: int = 0
+    summary_version: int = 0  # Bumped on every fold, so concurrent folds can't both apply
+    
+    # Metadata
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "chat_sessions"
+        indexes = [
+            "user_id",
+            ("user_id", "updated_at")  # Compound index
+        ]
@@ -0,0 +1,28 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from typing import Optional, Dict, List
+from datetime import datetime
+
+
+class ForecastModel(Document):
+    """Per-user vitals trend models, kept as least-squares sufficient statistics"""
+    
+    # Owner Info
+    user_id: str
+    
+    # Model State
+    origin: Optional[datetime] = None  # Day zero of the time feature (the user's first log date)
+    trained_until: Optional[datetime] = None  # Training watermark on log created_at
+    trained_ids: List[str] = Field(default_factory=list)  # Trained logs created at or after the watermark
+    generation: int = 0  # Bumped when an edit or delete forces a retrain from scratch
+    stats: Dict[str, Dict] = Field(default_factory=dict)  # field -> n, sum_t, sum_tt, sum_y, sum_ty, sum_yy, last_value, last_date
+    
+    # Metadata
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "forecast_models"
+        indexes = [
+            IndexModel([("user_id", ASCENDING)], unique=True)
+        ]
@@ -1,5 +1,6 @@
 from beanie import Document
 from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from typing import Optional, Dict
 from datetime import datetime
 from enum import Enum
@@ -82,7 +83,8 @@ class HealthLog(Document):
         indexes = [
             "user_id",
             "log_date",
-            ("user_id", "log_date")  # Compound index
+            ("user_id", "log_date"),  # Compound index
+            IndexModel([("user_id", ASCENDING), ("log_date", DESCENDING), ("_id", DESCENDING)])  # Keyset pagination
         ]
     
     class Config:
@@ -1,5 +1,6 @@
 from beanie import Document
 from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from typing import Optional, Dict, List
 from datetime import datetime
 
@@ -36,7 +37,8 @@ class HealthInsight(Document):
         indexes = [
             "user_id",
             "analysis_date",
-            ("user_id", "analysis_date")  # Compound index
+            ("user_id", "analysis_date"),  # Compound index
+            IndexModel([("user_id", ASCENDING), ("analysis_date", DESCENDING), ("_id", DESCENDING)])  # Keyset pagination
         ]
     
     class Config:
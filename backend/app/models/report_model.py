@@ -1,9 +1,15 @@
-from beanie import Document
-from pydantic import Field
+from beanie import Document, before_event, after_event, Insert, Replace, Save, SaveChanges
+from pydantic import Field, field_validator
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from typing import Optional, Dict
 from datetime import datetime
 from enum import Enum
 
+from app.utils.encryption_utils import reveal, seal
+
+# Stored encrypted; decrypted when a document is loaded
+ENCRYPTED_FIELDS = ["diagnosis", "medications"]
+
 
 class ReportType(str, Enum):
     """Types of health reports"""
@@ -44,6 +50,10 @@ class HealthReport(Document):
     medications: list[str] = Field(default_factory=list)
     test_results: Optional[Dict] = None  # Key-value pairs of test results
     
+    # Blind indexes (keyed HMACs) for equality search on sensitive fields
+    diagnosis_index: Optional[str] = None
+    medication_index: list[str] = Field(default_factory=list)
+    
     # Access Control
     shared_with_doctors: list[str] = Field(default_factory=list)  # Doctor IDs
     is_sensitive: bool = Field(default=False)
@@ -53,12 +63,39 @@ class HealthReport(Document):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     tags: list[str] = Field(default_factory=list)
     
+    @field_validator("diagnosis", mode="before")
+    @classmethod
+    def decrypt_diagnosis(cls, value):
+        return reveal(value)
+    
+    @field_validator("medications", mode="before")
+    @classmethod
+    def decrypt_medications(cls, value):
+        return [reveal(m) for m in value] if value else value
+    
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def encrypt_sensitive_fields(self):
+        """Encrypt diagnosis and medications for storage, indexing their plaintext first"""
+        self.diagnosis, self.diagnosis_index = seal(self.diagnosis)
+        sealed = [seal(m) for m in self.medications]
+        self.medications = [ciphertext for ciphertext, _ in sealed]
+        self.medication_index = [index for _, index in sealed if index]
+    
+    @after_event(Insert, Replace, Save, SaveChanges)
+    def decrypt_sensitive_fields(self):
+        """Hand plaintext back to callers once the encrypted copy is written"""
+        self.diagnosis = reveal(self.diagnosis)
+        self.medications = [reveal(m) for m in self.medications]
+    
     class Settings:
         name = "health_reports"
         indexes = [
             "user_id",
             "report_type",
-            "report_date"
+            "report_date",
+            ("user_id", "diagnosis_index"),
+            ("user_id", "medication_index"),
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])  # Keyset pagination
         ]
     
     class Config:
@@ -0,0 +1,44 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from typing import Optional, Dict
+from datetime import datetime
+
+from app.config import settings
+
+
+class LLMUsage(Document):
+    """Hourly LLM call aggregates per route, model and user"""
+    
+    # Bucket Key
+    period_start: datetime  # Start of the hour
+    route: str
+    model: str
+    user_id: Optional[str] = None  # None for calls not made on behalf of a user (e.g. cache warm-up)
+    
+    # Counters
+    calls: int = 0
+    errors: int = 0
+    aborted: int = 0  # Calls abandoned by the caller, e.g. a client closing a stream
+    error_classes: Dict[str, int] = Field(default_factory=dict)
+    retries: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    
+    # Timing
+    latency_ms_total: float = 0.0
+    latency_ms_max: float = 0.0
+    ttft_ms_total: float = 0.0  # Streaming calls only
+    ttft_count: int = 0
+    
+    class Settings:
+        name = "llm_usage"
+        indexes = [
+            IndexModel(
+                [("period_start", ASCENDING), ("route", ASCENDING), ("model", ASCENDING), ("user_id", ASCENDING)],
+                unique=True
+            ),
+            ("user_id", "period_start"),
+            IndexModel([("period_start", ASCENDING)], expireAfterSeconds=settings.AI_TELEMETRY_RETENTION_DAYS * 86400)
+        ]
@@ -0,0 +1,48 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from typing import Optional
+from datetime import datetime
+
+
+class RefreshToken(Document):
+    """Issued refresh token, tracked for rotation and reuse detection"""
+    
+    # Token Identity
+    jti: str
+    user_id: str
+    family_id: str  # Shared by every token rotated from the same login
+    
+    # State
+    revoked: bool = Field(default=False)
+    replaced_by: Optional[str] = None  # jti of the token issued on rotation
+    
+    # Metadata
+    expires_at: datetime
+    used_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "refresh_tokens"
+        indexes = [
+            IndexModel([("jti", ASCENDING)], unique=True),
+            "family_id",
+            "user_id",
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0)  # Mongo purges expired tokens
+        ]
+
+
+class RevokedToken(Document):
+    """Access token revoked before its expiry (logout), shared by every worker"""
+    
+    digest: str  # sha256 of the token; raw tokens are never stored
+    expires_at: datetime  # The token's own exp; Mongo drops the entry once it could no longer validate
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "revoked_tokens"
+        indexes = [
+            IndexModel([("digest", ASCENDING)], unique=True),
+            "created_at",
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        ]
@@ -1,9 +1,12 @@
-from beanie import Document
-from pydantic import EmailStr, Field
+from beanie import Document, before_event, after_event, Insert, Replace, Save, SaveChanges
+from pydantic import EmailStr, Field, field_validator
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from app.utils.encryption_utils import reveal, seal
+
 
 class UserRole(str, Enum):
     """User role types"""
@@ -19,7 +22,8 @@ class User(Document):
     email: EmailStr = Field(..., unique=True, index=True)
     hashed_password: str
     full_name: str
-    phone: Optional[str] = None
+    phone: Optional[str] = None  # Stored encrypted
+    phone_index: Optional[str] = None  # Blind index for equality search on phone
     date_of_birth: Optional[datetime] = None
     gender: Optional[str] = None
     
@@ -43,17 +47,39 @@ class User(Document):
     assigned_doctor_id: Optional[str] = None  # For patients
     patients_list: List[str] = Field(default_factory=list)  # For doctors
     
+    # Risk Scoring (written by RiskService batch runs)
+    risk_score: Optional[float] = None  # 0-100, higher needs attention sooner
+    risk_flags: List[str] = Field(default_factory=list)
+    risk_scored_at: Optional[datetime] = None
+    
     # Metadata
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     last_login: Optional[datetime] = None
     
+    @field_validator("phone", mode="before")
+    @classmethod
+    def decrypt_phone(cls, value):
+        return reveal(value)
+    
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def encrypt_sensitive_fields(self):
+        """Encrypt the phone number for storage, indexing its plaintext first"""
+        self.phone, self.phone_index = seal(self.phone)
+    
+    @after_event(Insert, Replace, Save, SaveChanges)
+    def decrypt_sensitive_fields(self):
+        """Hand plaintext back to callers once the encrypted copy is written"""
+        self.phone = reveal(self.phone)
+    
     class Settings:
         name = "users"
         indexes = [
             "email",
             "role",
-            "is_active"
+            "is_active",
+            "phone_index",
+            IndexModel([("assigned_doctor_id", ASCENDING), ("risk_score", DESCENDING)])  # Doctor's panel by risk
         ]
     
     class Config:
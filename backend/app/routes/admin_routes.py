@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from app.models.user_model import User, UserRole
+from app.utils.role_utils import require_role
+from app.services.telemetry_service import LLMTelemetryService
+from app.services.risk_service import RiskService
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+
+@router.get("/llm-usage")
+async def get_llm_usage(
+    hours: int = 24,
+    limit: int = 50,
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Token, cost and latency rollups for LLM calls
+    
+    - **hours**: Look-back window in hours (default: 24)
+    - **limit**: Max rows per grouping, highest cost first (default: 50)
+    """
+    if hours < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="hours must be at least 1"
+        )
+    
+    # Include calls still buffered in this process
+    await LLMTelemetryService.flush()
+    
+    return {
+        "window_hours": hours,
+        "by_route": await LLMTelemetryService.rollup("route", hours, limit),
+        "by_model": await LLMTelemetryService.rollup("model", hours, limit),
+        "by_user": await LLMTelemetryService.rollup("user_id", hours, limit)
+    }
+
+
+@router.post("/risk-scores/run")
+async def run_risk_scoring(
+    doctor_id: Optional[str] = None,
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Recompute patient risk scores now
+    
+    - **doctor_id**: Only score this doctor's patients (default: all patients)
+    """
+    return await RiskService.score_patients(doctor_id)
@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
+from contextlib import aclosing
+import json
 
+from app.config import settings
 from app.models.user_model import User
 from app.models.healthlog_model import HealthLog
 from app.models.insight_model import HealthInsight
 from app.utils.role_utils import get_current_user
+from app.utils.pagination_utils import NEXT_CURSOR_HEADER, keyset_filter, next_cursor, page_limit
 from app.services.ai_service import AIService
+from app.services.trend_service import TrendService
+from app.services.correlation_service import CorrelationService
+from app.services.forecast_service import ForecastService
+from app.services.chat_session_service import ChatSessionService
+from app.services.llm_provider import resolve_route
+from app.schemas.insight_schema import SaveInsightRequest
 from datetime import datetime
 
 router = APIRouter(prefix="/api/ai", tags=["AI Insights"])
@@ -19,12 +30,14 @@ class SymptomRequest(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
-    conversation_history: Optional[List[Dict]] = None
+    session_id: Optional[str] = None
+    conversation_history: Optional[List[Dict]] = None  # Stateless mode when no session_id is given
 
 
 class SelectedLogsRequest(BaseModel):
     log_ids: List[str]
     patient_name: Optional[str] = None
+    save: bool = False  # Persist the result as a HealthInsight
 
 
 @router.post("/analyze-selected")
@@ -37,6 +50,7 @@ async def analyze_selected_logs(
     
     - **log_ids**: List of log IDs to analyze
     - **patient_name**: Optional patient name to include in analysis
+    - **save**: Save the insight in the same request (returns `insight_id`)
     """
     # Get selected logs
     logs = []
@@ -54,8 +68,8 @@ async def analyze_selected_logs(
             detail="No logs found with the provided IDs"
         )
     
-    # Generate insights
-    insights = await AIService.analyze_health_trends(current_user, logs)
+    # Generate insights (identical concurrent requests share one AI call)
+    insights = await AIService.analyze_health_trends_shared("analyze-selected", current_user, logs, persist=request.save)
     
     return {
         "patient_name": request.patient_name or current_user.full_name,
@@ -86,8 +100,8 @@ async def get_health_insights(
             "logs_count": 0
         }
     
-    # Generate insights
-    insights = await AIService.analyze_health_trends(current_user, logs)
+    # Generate insights (only new logs are sent; unchanged data reuses the saved insight)
+    insights = await AIService.analyze_health_trends_shared("insights", current_user, logs, incremental=True)
     
     return {
         "user_name": current_user.full_name,
@@ -97,6 +111,118 @@ async def get_health_insights(
     }
 
 
+@router.get("/insights/stream")
+async def stream_health_insights(
+    http_request: Request,
+    days: int = 30,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get health insights streamed as server-sent events
+    
+    Emits a `facts` event with the locally computed trends and alerts as soon
+    as the logs are read, then an `insight` event with the AI analysis (same
+    body as GET /insights), or an `error` event that still carries the facts.
+    
+    - **days**: Number of days to analyze (default: 30)
+    """
+    logs = await HealthLog.find(
+        HealthLog.user_id == str(current_user.id)
+    ).sort("-log_date").limit(days).to_list()
+    
+    if not logs:
+        return {
+            "message": "No health data available. Start logging your daily health to get insights!",
+            "logs_count": 0
+        }
+    
+    async def event_stream():
+        # Shares its AI call with concurrent GET /insights requests over the same logs
+        events = AIService.stream_health_trends("insights", current_user, logs, incremental=True)
+        
+        async with aclosing(events):
+            async for event in events:
+                if await http_request.is_disconnected():
+                    break
+                
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/trends")
+async def get_health_trends(
+    days: int = 30,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get locally computed trends and alerts (no AI call)
+    
+    - **days**: Number of recent logs to analyze (default: 30)
+    """
+    logs = await HealthLog.find(
+        HealthLog.user_id == str(current_user.id)
+    ).sort("-log_date").limit(days).to_list()
+    
+    return {
+        "logs_analyzed": len(logs),
+        **TrendService.compute_facts(logs)
+    }
+
+
+@router.get("/correlations")
+async def get_health_correlations(
+    days: int = Query(90, ge=1, le=settings.CORRELATION_MAX_DAYS),
+    max_lag: int = Query(1, ge=0, le=settings.CORRELATION_MAX_LAG_DAYS),
+    significant_only: bool = True,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get correlations between health log fields (no AI call)
+    
+    Pearson and Spearman correlations between vitals, lifestyle fields and
+    symptom flags, same-day and lagged (field_a on one day vs field_b
+    `lag_days` later). Pairs need enough shared days to be reported, and
+    significance is adjusted for the number of pairs tested.
+    
+    - **days**: Number of days of logs to analyze (default: 90, max 730)
+    - **max_lag**: Largest lag in days to test (default: 1, max 7)
+    - **significant_only**: Only return significant pairs (default: true)
+    """
+    result = await CorrelationService.get_for_user(str(current_user.id), days, max_lag)
+    
+    if significant_only:
+        result = {**result, "pairs": [pair for pair in result["pairs"] if pair["significant"]]}
+    
+    return result
+
+
+@router.get("/forecast")
+async def get_vitals_forecast(
+    horizon_days: int = 14,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Forecast weight, blood pressure and blood sugar (no AI call)
+    
+    Per-user models are trained incrementally on new logs and cached, so
+    repeat requests are answered from memory.
+    
+    - **horizon_days**: Days ahead to predict (default: 14)
+    """
+    if not 1 <= horizon_days <= settings.FORECAST_MAX_HORIZON_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"horizon_days must be between 1 and {settings.FORECAST_MAX_HORIZON_DAYS}"
+        )
+    
+    return await ForecastService.forecast(str(current_user.id), horizon_days)
+
+
 @router.post("/symptom-advice")
 async def get_symptom_advice(
     request: SymptomRequest,
@@ -110,12 +236,21 @@ async def get_symptom_advice(
     """
     advice = await AIService.get_symptom_advice(
         symptom=request.symptom,
-        severity=request.severity
+        severity=request.severity,
+        user_id=str(current_user.id)
     )
     
     return advice
 
 
+async def _load_chat_session(request: ChatRequest, current_user: User):
+    """Resolve the server-side session for a chat request (None for stateless history requests)"""
+    if request.session_id is None and request.conversation_history is not None:
+        return None
+    
+    return await ChatSessionService.get_or_create(str(current_user.id), request.session_id)
+
+
 @router.post("/chat")
 async def chat_with_assistant(
     request: ChatRequest,
@@ -125,17 +260,101 @@ async def chat_with_assistant(
     Chat with AI health assistant
     
     - **message**: Your question or message
-    - **conversation_history**: Previous messages (optional)
+    - **session_id**: Continue a stored conversation (omit to start one)
+    - **conversation_history**: Previous messages, for stateless use without a session (optional)
     """
+    session = await _load_chat_session(request, current_user)
+    
     response = await AIService.chat_with_health_assistant(
         user=current_user,
         message=request.message,
-        conversation_history=request.conversation_history
+        conversation_history=session.recent_messages if session else request.conversation_history,
+        summary=session.summary if session else None
     )
     
+    if session:
+        if "error" not in response:
+            await ChatSessionService.record_turn(session, request.message, response["response"])
+        response["session_id"] = str(session.id)
+    
     return response
 
 
+@router.post("/chat/stream")
+async def stream_chat_with_assistant(
+    request: ChatRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Chat with AI health assistant, streamed as server-sent events
+    
+    Emits `token` events as text arrives, then a `done` event with
+    time-to-first-token and the session id, or an `error` event.
+    """
+    session = await _load_chat_session(request, current_user)
+    
+    async def event_stream():
+        events = AIService.stream_chat_with_health_assistant(
+            user=current_user,
+            message=request.message,
+            conversation_history=session.recent_messages if session else request.conversation_history,
+            summary=session.summary if session else None
+        )
+        reply = []
+        
+        async with aclosing(events):
+            async for event in events:
+                if await http_request.is_disconnected():
+                    break
+                
+                if event["type"] == "token":
+                    reply.append(event["content"])
+                elif event["type"] == "done" and session:
+                    await ChatSessionService.record_turn(session, request.message, "".join(reply))
+                    event["session_id"] = str(session.id)
+                
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/chat/sessions")
+async def list_chat_sessions(
+    limit: int = 20,
+    current_user: User = Depends(get_current_user)
+):
+    """List your recent chat sessions"""
+    sessions = await ChatSessionService.list_sessions(str(current_user.id), limit)
+    
+    return [
+        {
+            "session_id": str(session.id),
+            "turn_count": session.turn_count,
+            "summary": session.summary,
+            "recent_messages": session.recent_messages,
+            "created_at": session.created_at,
+            "updated_at": session.updated_at
+        }
+        for session in sessions
+    ]
+
+
+@router.delete("/chat/sessions/{session_id}")
+async def delete_chat_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Delete one of your chat sessions"""
+    await ChatSessionService.delete(str(current_user.id), session_id)
+    
+    return {"message": "Chat session deleted successfully"}
+
+
 @router.get("/sleep-analysis")
 async def analyze_sleep_patterns(
     current_user: User = Depends(get_current_user)
@@ -165,11 +384,35 @@ async def analyze_sleep_patterns(
 
 
 @router.get("/saved-insights")
-async def get_saved_insights(current_user: User = Depends(get_current_user)):
-    """Get saved insights for current user"""
-    insights = await HealthInsight.find(
-        HealthInsight.user_id == str(current_user.id)
-    ).sort("-analysis_date").to_list()
+async def get_saved_insights(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get saved insights for current user, newest first
+    
+    - **cursor**: Value of the `X-Next-Cursor` header from the previous page
+    - **limit**: Page size (max 100); without `limit` or `cursor` every insight is
+      returned in one response (deprecated, kept for existing clients)
+    """
+    query = HealthInsight.find(HealthInsight.user_id == str(current_user.id))
+    
+    if cursor:
+        query = query.find(keyset_filter("analysis_date", cursor))
+    
+    query = query.sort("-analysis_date", "-_id")
+    
+    if cursor or limit is not None:
+        limit = page_limit(limit if limit is not None else settings.PAGE_MAX_LIMIT)
+        insights = await query.limit(limit).to_list()
+        
+        page_cursor = next_cursor(insights, "analysis_date", limit)
+        if page_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = page_cursor
+    else:
+        insights = await query.to_list()
     
     return {
         "insights": [{
@@ -190,28 +433,27 @@ async def get_saved_insights(current_user: User = Depends(get_current_user)):
 
 @router.post("/save-insight")
 async def save_insight(
-    request: Dict,
+    request: SaveInsightRequest,
     current_user: User = Depends(get_current_user)
 ):
-    """Save AI-generated insight to database"""
-    import json as json_lib
+    """
+    Save an AI-generated insight to database
     
+    Not needed for server-generated insights: `/insights` saves automatically
+    and `/analyze-selected` saves with `save: true`.
+    """
     try:
-        insights = request.get('insights', {})
+        insights = request.insights.model_dump() if request.insights else {}
         
-        # Extract data from request
         insight = HealthInsight(
             user_id=str(current_user.id),
-            patient_name=request.get('patient_name', current_user.full_name),
-            analyzed_log_ids=request.get('log_ids', []),
-            logs_analyzed_count=request.get('logs_analyzed', 0),
-            insights_raw=request.get('insights_raw', str(request.get('insights', ''))),
-            trends=insights.get('trends') if isinstance(insights, dict) else None,
-            correlations=insights.get('correlations') if isinstance(insights, dict) else None,
-            recommendations=insights.get('recommendations', []) if isinstance(insights, dict) else [],
-            alerts=insights.get('alerts') if isinstance(insights, dict) else None,
-            data_points_analyzed=request.get('data_points_analyzed', 0),
-            ai_model_used="gpt-4o-mini",
+            patient_name=request.patient_name or current_user.full_name,
+            analyzed_log_ids=request.log_ids,
+            logs_analyzed_count=request.logs_analyzed,
+            insights_raw=request.insights_raw or json.dumps(insights),
+            data_points_analyzed=request.data_points_analyzed,
+            ai_model_used=request.ai_model_used or resolve_route("insights")[1],
+            **insights,
             analysis_date=datetime.utcnow(),
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
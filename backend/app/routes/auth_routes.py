@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict
+from fastapi.security import HTTPAuthorizationCredentials
+from typing import Dict, Optional
 
-from app.schemas.user_schema import UserRegister, UserLogin, TokenResponse, UserResponse, UserUpdate
+from app.schemas.user_schema import UserRegister, UserLogin, TokenResponse, UserResponse, UserUpdate, RefreshTokenRequest
 from app.services.auth_service import AuthService
-from app.models.user_model import User
-from app.utils.role_utils import get_current_user
+from app.services.token_revocation_service import TokenRevocationService
+from app.models.user_model import User, UserRole
+from app.utils.role_utils import get_current_user, require_role, security
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -33,6 +35,18 @@ async def login(login_data: UserLogin):
     return await AuthService.login_user(login_data)
 
 
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(request: RefreshTokenRequest):
+    """
+    Exchange a refresh token for a new access token
+    
+    - **refresh_token**: Refresh token from login/register or a previous refresh
+    
+    The refresh token is rotated; reusing an old one revokes the whole session.
+    """
+    return await AuthService.refresh_tokens(request.refresh_token)
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_profile(current_user: User = Depends(get_current_user)):
     """
@@ -77,13 +91,48 @@ async def update_profile(
     )
 
 
+@router.put("/users/{user_id}/active", response_model=UserResponse)
+async def set_user_active(
+    user_id: str,
+    is_active: bool,
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Activate or deactivate a user account (admin only)
+    
+    - **is_active**: false to deactivate, true to reactivate
+    """
+    user = await AuthService.set_user_active(user_id, is_active)
+    
+    return UserResponse(
+        id=str(user.id),
+        email=user.email,
+        full_name=user.full_name,
+        phone=user.phone,
+        role=user.role,
+        is_active=user.is_active,
+        created_at=user.created_at
+    )
+
+
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(
+    request: Optional[RefreshTokenRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user)
+):
     """
-    Logout user (client should delete token)
+    Logout user and revoke the current access token
+    
+    - **refresh_token**: Optional; revokes the refresh session as well
     
     Requires authentication token
     """
+    await TokenRevocationService.revoke(credentials.credentials)
+    
+    if request and request.refresh_token:
+        await AuthService.revoke_refresh_token(request.refresh_token)
+    
     return {"message": "Successfully logged out"}
 
 
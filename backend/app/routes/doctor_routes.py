@@ -1,26 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from typing import List, Optional
 
 from app.models.user_model import User, UserRole
 from app.models.report_model import HealthReport
 from app.models.healthlog_model import HealthLog
 from app.utils.role_utils import get_current_user, require_role
+from app.utils.encryption_utils import blind_index
+from app.utils.pagination_utils import NEXT_CURSOR_HEADER, keyset_filter, next_cursor, page_limit
+from app.models.batch_job_model import InsightBatchJob
+from app.services.batch_insight_service import BatchInsightService
 
 router = APIRouter(prefix="/api/doctor", tags=["Doctor"])
 
 
 @router.get("/patients", response_model=List[dict])
 async def get_my_patients(
+    phone: Optional[str] = None,
     current_user: User = Depends(require_role([UserRole.DOCTOR]))
 ):
     """
     Get list of patients assigned to current doctor
+    
+    - **phone**: Optional exact phone number to filter by (matched on a blind index;
+      older patients are missing until the encrypt_sensitive_fields migration has run)
     """
     # Get users where assigned_doctor_id matches current doctor
-    patients = await User.find(
+    query = User.find(
         User.assigned_doctor_id == str(current_user.id),
         User.role == UserRole.PATIENT
-    ).to_list()
+    )
+    
+    if phone:
+        query = query.find(User.phone_index == blind_index(phone))
+    
+    patients = await query.to_list()
     
     return [
         {
@@ -35,6 +48,35 @@ async def get_my_patients(
     ]
 
 
+@router.get("/patients/attention", response_model=List[dict])
+async def get_patients_needing_attention(
+    limit: int = 20,
+    current_user: User = Depends(require_role([UserRole.DOCTOR]))
+):
+    """
+    Get assigned patients ranked by risk score, highest first
+    
+    Scores come from the scheduled risk scoring run (see `risk_scored_at`).
+    
+    - **limit**: Number of patients to return (default: 20, max 100)
+    """
+    patients = await User.find(
+        User.assigned_doctor_id == str(current_user.id),
+        User.risk_score != None
+    ).sort("-risk_score").limit(page_limit(limit)).to_list()
+    
+    return [
+        {
+            "id": str(patient.id),
+            "full_name": patient.full_name,
+            "risk_score": patient.risk_score,
+            "risk_flags": patient.risk_flags,
+            "risk_scored_at": patient.risk_scored_at
+        }
+        for patient in patients
+    ]
+
+
 @router.get("/patient/{patient_id}/reports")
 async def get_patient_reports(
     patient_id: str,
@@ -62,11 +104,16 @@ async def get_patient_reports(
 @router.get("/patient/{patient_id}/logs")
 async def get_patient_logs(
     patient_id: str,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 30,
     current_user: User = Depends(require_role([UserRole.DOCTOR]))
 ):
     """
-    Get health logs for a specific patient (doctor access)
+    Get health logs for a specific patient (doctor access), newest first
+    
+    - **cursor**: Value of the `X-Next-Cursor` header from the previous page
+    - **limit**: Number of results (default: 30, max 100)
     """
     patient = await User.get(patient_id)
     
@@ -76,8 +123,58 @@ async def get_patient_logs(
             detail="You don't have access to this patient's records"
         )
     
-    logs = await HealthLog.find(
-        HealthLog.user_id == patient_id
-    ).sort("-log_date").limit(limit).to_list()
+    query = HealthLog.find(HealthLog.user_id == patient_id)
+    
+    if cursor:
+        query = query.find(keyset_filter("log_date", cursor))
+    
+    limit = page_limit(limit)
+    logs = await query.sort("-log_date", "-_id").limit(limit).to_list()
+    
+    page_cursor = next_cursor(logs, "log_date", limit)
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
     
     return logs
+
+
+@router.post("/insights/batch")
+async def start_batch_insights(
+    days: int = 30,
+    current_user: User = Depends(require_role([UserRole.DOCTOR]))
+):
+    """
+    Generate AI insights for every assigned patient in the background
+    
+    Patients whose logs haven't changed since their last insight are skipped.
+    If a batch is already running it is returned instead of starting another.
+    
+    - **days**: Number of recent logs analyzed per patient (default: 30)
+    """
+    job = await BatchInsightService.start_job(current_user, days)
+    
+    return BatchInsightService.progress(job)
+
+
+@router.get("/insights/batch")
+async def list_batch_insights(
+    limit: int = 10,
+    current_user: User = Depends(require_role([UserRole.DOCTOR]))
+):
+    """List recent batch insight jobs"""
+    jobs = await InsightBatchJob.find(
+        InsightBatchJob.doctor_id == str(current_user.id)
+    ).sort("-created_at").limit(limit).to_list()
+    
+    return [BatchInsightService.progress(job) for job in jobs]
+
+
+@router.get("/insights/batch/{job_id}")
+async def get_batch_insights(
+    job_id: str,
+    current_user: User = Depends(require_role([UserRole.DOCTOR]))
+):
+    """Get progress and throughput of a batch insight job"""
+    job = await BatchInsightService.get_job(current_user, job_id)
+    
+    return BatchInsightService.progress(job)
@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
+from beanie import PydanticObjectId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
 
 from app.models.user_model import User
 from app.models.healthlog_model import HealthLog
 from app.schemas.healthlog_schema import HealthLogCreate, HealthLogUpdate, HealthLogResponse
 from app.utils.role_utils import get_current_user
+from app.utils.pagination_utils import NEXT_CURSOR_HEADER, keyset_filter, next_cursor, page_limit
+from app.services.correlation_service import invalidate_correlations
+from app.services.forecast_service import ForecastService, FORECAST_FIELDS, mark_forecast_stale
+from app.services.export_service import ExportService
 
 router = APIRouter(prefix="/api/logs", tags=["Health Logs"])
 
@@ -33,6 +43,8 @@ async def create_health_log(
         )
         
         await health_log.insert()
+        invalidate_correlations(health_log.user_id)
+        mark_forecast_stale(health_log.user_id)
     except Exception as e:
         print(f"Error creating log: {e}")
         raise HTTPException(
@@ -66,20 +78,96 @@ async def create_health_log(
     )
 
 
+@router.post("/bulk")
+async def create_health_logs_bulk(
+    entries: List[Any] = Body(...),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Create many health log entries in one request (app / wearable sync)
+    
+    Each entry is validated like `POST /api/logs/`. Valid entries are written
+    in one unordered batch; invalid or failed entries don't stop the others.
+    Results are returned per entry, in request order.
+    """
+    if len(entries) > settings.MAX_BULK_LOGS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.MAX_BULK_LOGS} entries per request"
+        )
+    
+    user_id = str(current_user.id)
+    now = datetime.utcnow()
+    results: List[Dict] = [None] * len(entries)
+    documents, positions = [], []
+    
+    for index, entry in enumerate(entries):
+        try:
+            log_data = HealthLogCreate.model_validate(entry)
+        except ValidationError as e:
+            results[index] = {
+                "index": index,
+                "status": "invalid",
+                "errors": [
+                    {"field": ".".join(str(part) for part in error["loc"]), "message": error["msg"]}
+                    for error in e.errors()
+                ]
+            }
+            continue
+        
+        # Ids are assigned up front so each result can report its own id
+        documents.append(HealthLog(
+            id=PydanticObjectId(),
+            user_id=user_id,
+            log_date=log_data.log_date or now,
+            **log_data.dict(exclude={'log_date'}),
+            created_at=now
+        ))
+        positions.append(index)
+    
+    failed_writes = {}
+    if documents:
+        try:
+            await HealthLog.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: everything except the reported writes was inserted
+            failed_writes = {error["index"]: error["errmsg"] for error in e.details.get("writeErrors", [])}
+    
+    for batch_index, (index, document) in enumerate(zip(positions, documents)):
+        if batch_index in failed_writes:
+            results[index] = {"index": index, "status": "failed", "error": failed_writes[batch_index]}
+        else:
+            results[index] = {"index": index, "status": "created", "id": str(document.id)}
+    
+    created = sum(1 for result in results if result["status"] == "created")
+    if created:
+        invalidate_correlations(user_id)
+        mark_forecast_stale(user_id)
+    
+    return {
+        "created": created,
+        "failed": len(entries) - created,
+        "results": results
+    }
+
+
 @router.get("/", response_model=List[HealthLogResponse])
 async def get_my_logs(
+    response: Response,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get health logs for current user
+    Get health logs for current user, newest first
     
     - **start_date**: Filter from this date
     - **end_date**: Filter until this date
-    - **skip**: Pagination offset
+    - **cursor**: Value of the `X-Next-Cursor` header from the previous page
+    - **skip**: Pagination offset (deprecated, prefer `cursor`)
     - **limit**: Number of results (max 100)
     """
     query = HealthLog.find(HealthLog.user_id == str(current_user.id))
@@ -90,7 +178,17 @@ async def get_my_logs(
     if end_date:
         query = query.find(HealthLog.log_date <= end_date)
     
-    logs = await query.sort("-log_date").skip(skip).limit(limit).to_list()
+    if cursor:
+        query = query.find(keyset_filter("log_date", cursor))
+    elif skip:
+        query = query.skip(skip)
+    
+    limit = page_limit(limit)
+    logs = await query.sort("-log_date", "-_id").limit(limit).to_list()
+    
+    page_cursor = next_cursor(logs, "log_date", limit)
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
     
     return [
         HealthLogResponse(
@@ -152,6 +250,44 @@ async def get_today_log(current_user: User = Depends(get_current_user)):
     )
 
 
+@router.get("/export")
+async def export_logs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    include_reports: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Download your full health log history, streamed
+    
+    - **format**: `ndjson` (one JSON object per line) or `csv`
+    - **start_date** / **end_date**: Optional log date range
+    - **include_reports**: Add health report metadata (NDJSON only)
+    """
+    if include_reports and format == "csv":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="include_reports is only supported for ndjson exports"
+        )
+    
+    user_id = str(current_user.id)
+    filename = f"health_logs_{datetime.utcnow().strftime('%Y%m%d')}.{format}"
+    
+    if format == "csv":
+        content = ExportService.stream_csv(user_id, start_date, end_date)
+        media_type = "text/csv"
+    else:
+        content = ExportService.stream_ndjson(user_id, start_date, end_date, include_reports)
+        media_type = "application/x-ndjson"
+    
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 @router.get("/{log_id}", response_model=HealthLogResponse)
 async def get_log(
     log_id: str,
@@ -214,6 +350,9 @@ async def update_log(
     
     log.updated_at = datetime.utcnow()
     await log.save()
+    invalidate_correlations(log.user_id)
+    if "log_date" in update_dict or FORECAST_FIELDS.keys() & update_dict.keys():
+        await ForecastService.reset(log.user_id)
     
     return HealthLogResponse(
         id=str(log.id),
@@ -249,5 +388,7 @@ async def delete_log(
         )
     
     await log.delete()
+    invalidate_correlations(log.user_id)
+    await ForecastService.reset(log.user_id)
     
     return {"message": "Log deleted successfully"}
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Response
 from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime
@@ -11,6 +11,8 @@ from app.schemas.report_schema import ReportCreate, ReportUpdate, ReportResponse
 from app.utils.role_utils import get_current_user
 from app.services.file_service import FileService
 from app.services.pdf_service import PDFService
+from app.utils.encryption_utils import blind_index
+from app.utils.pagination_utils import NEXT_CURSOR_HEADER, keyset_filter, next_cursor, page_limit
 
 router = APIRouter(prefix="/api/reports", tags=["Health Reports"])
 
@@ -117,24 +119,86 @@ async def export_health_summary(
 
 @router.get("/", response_model=List[ReportResponse])
 async def get_my_reports(
+    response: Response,
     report_type: Optional[ReportType] = None,
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get all reports for current user
+    Get all reports for current user, newest first
     
     - **report_type**: Filter by report type (optional)
-    - **skip**: Pagination offset
-    - **limit**: Number of results
+    - **cursor**: Value of the `X-Next-Cursor` header from the previous page
+    - **skip**: Pagination offset (deprecated, prefer `cursor`)
+    - **limit**: Number of results (max 100)
     """
     query = HealthReport.find(HealthReport.user_id == str(current_user.id))
     
     if report_type:
         query = query.find(HealthReport.report_type == report_type)
     
-    reports = await query.sort("-created_at").skip(skip).limit(limit).to_list()
+    if cursor:
+        query = query.find(keyset_filter("created_at", cursor))
+    elif skip:
+        query = query.skip(skip)
+    
+    limit = page_limit(limit)
+    reports = await query.sort("-created_at", "-_id").limit(limit).to_list()
+    
+    page_cursor = next_cursor(reports, "created_at", limit)
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
+    
+    return [
+        ReportResponse(
+            id=str(report.id),
+            user_id=report.user_id,
+            report_type=report.report_type,
+            title=report.title,
+            description=report.description,
+            report_date=report.report_date,
+            file_name=report.file_name,
+            file_type=report.file_type,
+            doctor_name=report.doctor_name,
+            created_at=report.created_at
+        )
+        for report in reports
+    ]
+
+
+@router.get("/search", response_model=List[ReportResponse])
+async def search_my_reports(
+    diagnosis: Optional[str] = None,
+    medication: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Find reports by exact diagnosis or medication (case-insensitive)
+    
+    Matches on blind indexes, since the fields are stored encrypted. Reports
+    created before encryption only match once the encrypt_sensitive_fields
+    migration (app.database.migrations) has run.
+    
+    - **diagnosis**: Diagnosis to match
+    - **medication**: Medication to match
+    """
+    if not diagnosis and not medication:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide a diagnosis or medication to search for"
+        )
+    
+    query = HealthReport.find(HealthReport.user_id == str(current_user.id))
+    
+    if diagnosis:
+        query = query.find(HealthReport.diagnosis_index == blind_index(diagnosis))
+    
+    if medication:
+        query = query.find({"medication_index": blind_index(medication)})
+    
+    reports = await query.sort("-created_at").to_list()
     
     return [
         ReportResponse(
@@ -0,0 +1,69 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Dict, Any
+import json
+import re
+
+
+def _as_dict(value: Any) -> Optional[Dict]:
+    """Coerce model output for a dict field (text or lists are wrapped, not dropped)"""
+    if value is None or value == "" or value == [] or value == {}:
+        return None
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, list):
+        return {str(i + 1): item for i, item in enumerate(value)}
+    return {"summary": str(value)}
+
+
+class InsightContent(BaseModel):
+    """Structured AI insight, validated from the model's JSON output"""
+    trends: Optional[Dict] = None
+    correlations: Optional[Dict] = None
+    recommendations: List[str] = Field(default_factory=list)
+    alerts: Optional[Dict] = None
+    
+    @field_validator("trends", "correlations", "alerts", mode="before")
+    @classmethod
+    def coerce_dict(cls, value):
+        return _as_dict(value)
+    
+    @field_validator("recommendations", mode="before")
+    @classmethod
+    def coerce_list(cls, value):
+        if value is None or value == "":
+            return []
+        if isinstance(value, dict):
+            value = list(value.values())
+        if not isinstance(value, list):
+            value = [value]
+        return [item if isinstance(item, str) else json.dumps(item) for item in value]
+
+
+class SaveInsightRequest(BaseModel):
+    """Schema for saving an insight produced outside the server"""
+    patient_name: Optional[str] = None
+    log_ids: List[str] = Field(default_factory=list)
+    logs_analyzed: int = 0
+    insights_raw: Optional[str] = None
+    insights: Optional[InsightContent] = None
+    data_points_analyzed: int = 0
+    ai_model_used: Optional[str] = None
+
+
+def parse_insight(text: Optional[str]) -> Optional[InsightContent]:
+    """Parse model output (plain or fenced JSON) into InsightContent, or None if it isn't JSON"""
+    if not text:
+        return None
+    
+    fenced = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", text)
+    candidate = fenced.group(1) if fenced else text
+    
+    try:
+        data = json.loads(candidate)
+    except ValueError:
+        return None
+    
+    if not isinstance(data, dict):
+        return None
+    
+    return InsightContent.model_validate(data)
@@ -48,5 +48,11 @@ class UserResponse(BaseModel):
 class TokenResponse(BaseModel):
     """Schema for authentication token"""
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
     user: UserResponse
+
+
+class RefreshTokenRequest(BaseModel):
+    """Schema for refreshing or revoking a refresh token"""
+    refresh_token: str
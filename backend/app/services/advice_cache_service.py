@@ -0,0 +1,311 @@
+import math
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+from beanie.operators import In
+
+from app.config import settings
+from app.models.advice_model import SymptomAdvice
+from app.utils.task_utils import PeriodicTask
+
+# Re-read this much history each sync so advice still being written is not missed
+SYNC_OVERLAP = timedelta(minutes=1)
+
+# Filler words that do not change which advice applies
+_FILLER_WORDS = {
+    "i", "im", "ive", "have", "has", "had", "am", "a", "an", "the", "my", "me",
+    "got", "getting", "feel", "feeling", "some", "bit", "little", "really", "very",
+    "bad", "since", "today", "with", "of", "and"
+}
+
+# Words that flip a symptom's meaning; phrasings only match when these agree exactly
+_NEGATION_WORDS = {"no", "not", "without", "never", "non", "denies", "denied"}
+
+# Symptoms precomputed by the warm-up command
+COMMON_SYMPTOMS = [
+    "headache", "migraine", "fever", "cough", "dry cough", "sore throat", "runny nose",
+    "nasal congestion", "fatigue", "nausea", "vomiting", "diarrhea", "constipation",
+    "stomach pain", "back pain", "chest pain", "joint pain", "muscle pain", "dizziness",
+    "shortness of breath", "insomnia", "anxiety", "rash", "itching", "ear pain",
+    "toothache", "heartburn", "bloating", "cold", "body ache"
+]
+
+# General symptom vocabulary. The cache is shared by all users, so only phrasings made
+# entirely of these words are stored; anything else (names, dates, numbers) may identify someone.
+_GENERAL_WORDS = """
+    head eye ear nose sinus throat neck shoulder arm elbow wrist hand finger chest heart
+    breast back spine rib stomach abdomen abdominal belly side hip groin leg knee ankle foot
+    feet toe skin scalp tooth teeth gum jaw mouth tongue lip face body muscle joint bone
+    pain ache aching sore soreness swelling swollen stiff stiffness cramp cramping numb
+    numbness tingling weakness weak tired tiredness sleepy drowsy chill sweat sweating
+    sneezing wheezing congestion congested blocked stuffy itchy red dry wet watery blurred
+    blurry vision hearing loss appetite smell taste palpitation racing pounding bleeding
+    blood bruise bruising burn cut sprain blister hive acne pimple lump ulcer infection
+    flu allergy allergic period menstrual indigestion gas acid reflux thirst urination
+    frequent phlegm mucus nosebleed lightheaded faint fainting confusion stress panic attack
+    breath breathing short tightness tight pressure sharp dull throbbing burning stabbing
+    shooting mild moderate severe constant chronic acute sudden persistent recurring slight
+    high low night morning evening lower upper left right both in on at when after during
+    around behind under over eating swallowing standing walking lying down sitting
+    trouble difficulty can cannot sleep sleeping
+"""
+
+
+class AdviceCacheService:
+    """Persistent symptom advice cache with TF-IDF matching of near-duplicate phrasings"""
+    
+    # severity -> normalized symptom -> (advice, expires_at)
+    _entries: Dict[str, Dict[str, Tuple[str, datetime]]] = {}
+    # severity -> (vectorizer, matrix, keys), rebuilt lazily after changes
+    _indexes: Dict[str, Tuple[TfidfVectorizer, object, List[str]]] = {}
+    _synced_at: Optional[datetime] = None
+    _syncer = PeriodicTask(
+        "Symptom advice cache sync",
+        settings.ADVICE_CACHE_SYNC_SECONDS,
+        lambda: AdviceCacheService.sync()
+    )
+    hits = 0
+    misses = 0
+    
+    @staticmethod
+    def normalize_symptom(symptom: str) -> str:
+        """Lowercase, strip punctuation, filler words and plural s"""
+        words = re.sub(r"[^a-z0-9\s]", " ", symptom.lower()).split()
+        words = [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith(("ss", "us", "is")) else w for w in words]
+        kept = [w for w in words if w not in _FILLER_WORDS]
+        return " ".join(kept or words)
+    
+    
+    @staticmethod
+    def is_general(normalized: str) -> bool:
+        """Whether a normalized phrasing uses only general symptom words, so it is safe to share"""
+        return all(word in _GENERAL_VOCABULARY for word in normalized.split())
+    
+    
+    @staticmethod
+    async def load():
+        """Load unexpired advice from MongoDB into memory (and purge any personal phrasings)"""
+        started = datetime.utcnow()
+        AdviceCacheService._entries = {}
+        AdviceCacheService._indexes = {}
+        
+        entries = await SymptomAdvice.find(SymptomAdvice.expires_at > started).to_list()
+        personal = []
+        for entry in entries:
+            if AdviceCacheService.is_general(entry.normalized_symptom):
+                AdviceCacheService._remember(entry.normalized_symptom, entry.severity, entry.advice, entry.expires_at)
+            else:
+                personal.append(entry.id)
+        
+        if personal:
+            # Stored before phrasings were screened
+            await SymptomAdvice.find(In(SymptomAdvice.id, personal)).delete()
+        
+        AdviceCacheService._synced_at = started
+        print(f"Symptom advice cache loaded: {len(entries) - len(personal)} entries")
+    
+    
+    @staticmethod
+    async def sync() -> int:
+        """Load advice stored by other workers since the last sync"""
+        if AdviceCacheService._synced_at is None:
+            await AdviceCacheService.load()
+            return AdviceCacheService.stats()["size"]
+        
+        started = datetime.utcnow()
+        entries = await SymptomAdvice.find(
+            SymptomAdvice.updated_at >= AdviceCacheService._synced_at - SYNC_OVERLAP,
+            SymptomAdvice.expires_at > started
+        ).to_list()
+        
+        for entry in entries:
+            if AdviceCacheService.is_general(entry.normalized_symptom):
+                AdviceCacheService._remember(entry.normalized_symptom, entry.severity, entry.advice, entry.expires_at)
+        
+        AdviceCacheService._synced_at = started
+        return len(entries)
+    
+    
+    @staticmethod
+    def _remember(normalized: str, severity: str, advice: str, expires_at: datetime):
+        entries = AdviceCacheService._entries.setdefault(severity, {})
+        
+        # The similarity index only depends on the keys
+        if normalized not in entries:
+            AdviceCacheService._indexes.pop(severity, None)
+        
+        entries[normalized] = (advice, expires_at)
+    
+    
+    @staticmethod
+    def _same_words(query: str, key: str) -> bool:
+        """Whether two phrasings share negations and every other word has a close counterpart"""
+        query_words, key_words = set(query.split()), set(key.split())
+        
+        if query_words & _NEGATION_WORDS != key_words & _NEGATION_WORDS:
+            return False
+        
+        def covered(words, others):
+            return all(
+                any(SequenceMatcher(None, word, other).ratio() >= settings.ADVICE_CACHE_TOKEN_SIMILARITY for other in others)
+                for word in words - _NEGATION_WORDS
+            )
+        
+        return covered(query_words, key_words) and covered(key_words, query_words)
+    
+    
+    @staticmethod
+    def _nearest(normalized: str, severity: str) -> Optional[str]:
+        """Find the most similar cached phrasing above the similarity threshold"""
+        entries = AdviceCacheService._entries.get(severity)
+        if not entries:
+            return None
+        
+        if severity not in AdviceCacheService._indexes:
+            keys = list(entries.keys())
+            vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), norm=None)
+            matrix = normalize(vectorizer.fit_transform(keys))
+            AdviceCacheService._indexes[severity] = (vectorizer, matrix, keys)
+        
+        vectorizer, matrix, keys = AdviceCacheService._indexes[severity]
+        
+        # n-grams the keys never saw still count towards the query's norm (at the unseen-term idf),
+        # otherwise extra words like "blood" in "cough blood" would vanish from the comparison
+        query = vectorizer.transform([normalized])
+        unseen_idf = math.log(len(keys) + 1) + 1
+        unseen = sum(
+            (count * unseen_idf) ** 2
+            for gram, count in Counter(vectorizer.build_analyzer()(normalized)).items()
+            if gram not in vectorizer.vocabulary_
+        )
+        query_norm = math.sqrt(query.multiply(query).sum() + unseen)
+        if query_norm == 0:
+            return None
+        
+        scores = (matrix @ query.T).toarray().ravel() / query_norm
+        
+        for index in scores.argsort()[::-1]:
+            if scores[index] < settings.ADVICE_CACHE_SIMILARITY:
+                break
+            if AdviceCacheService._same_words(normalized, keys[index]):
+                return keys[index]
+        return None
+    
+    
+    @staticmethod
+    def lookup(symptom: str, severity: str) -> Optional[str]:
+        """Get cached advice for a symptom or a close phrasing of it"""
+        normalized = AdviceCacheService.normalize_symptom(symptom)
+        severity = severity.lower().strip()
+        entries = AdviceCacheService._entries.get(severity, {})
+        
+        key = normalized if normalized in entries else AdviceCacheService._nearest(normalized, severity)
+        
+        if key is not None:
+            advice, expires_at = entries[key]
+            if expires_at > datetime.utcnow():
+                AdviceCacheService.hits += 1
+                return advice
+            
+            del entries[key]
+            AdviceCacheService._indexes.pop(severity, None)
+        
+        AdviceCacheService.misses += 1
+        return None
+    
+    
+    @staticmethod
+    async def store(symptom: str, severity: str, advice: str, model: str):
+        """Persist advice and make it available to lookups (general phrasings only)"""
+        normalized = AdviceCacheService.normalize_symptom(symptom)
+        if not AdviceCacheService.is_general(normalized):
+            return
+        
+        severity = severity.lower().strip()
+        now = datetime.utcnow()
+        expires_at = now + timedelta(hours=settings.ADVICE_CACHE_TTL_HOURS)
+        
+        await SymptomAdvice.get_motor_collection().update_one(
+            {"normalized_symptom": normalized, "severity": severity},
+            {
+                "$set": {"advice": advice, "ai_model_used": model, "expires_at": expires_at, "updated_at": now},
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True
+        )
+        
+        AdviceCacheService._remember(normalized, severity, advice, expires_at)
+    
+    
+    @staticmethod
+    def start():
+        """Start the periodic sync task"""
+        AdviceCacheService._syncer.start()
+    
+    
+    @staticmethod
+    async def stop():
+        """Stop the periodic sync task"""
+        await AdviceCacheService._syncer.stop()
+    
+    
+    @staticmethod
+    def stats() -> Dict:
+        lookups = AdviceCacheService.hits + AdviceCacheService.misses
+        
+        return {
+            "size": sum(len(e) for e in AdviceCacheService._entries.values()),
+            "hits": AdviceCacheService.hits,
+            "misses": AdviceCacheService.misses,
+            "hit_rate": round(AdviceCacheService.hits / lookups, 4) if lookups else 0.0
+        }
+    
+    
+    @staticmethod
+    async def warm_up(symptoms: List[str] = None, severities: List[str] = None) -> int:
+        """Precompute advice for common symptoms that are not cached yet"""
+        from app.services.ai_service import AIService
+        
+        symptoms = symptoms or COMMON_SYMPTOMS
+        severities = severities or ["mild", "moderate", "severe"]
+        generated = 0
+        
+        for symptom in symptoms:
+            for severity in severities:
+                if AdviceCacheService.lookup(symptom, severity) is not None:
+                    continue
+                
+                result = await AIService.get_symptom_advice(symptom, severity)
+                if "error" in result:
+                    print(f"Warning: Could not warm '{symptom}' ({severity}): {result['error']}")
+                else:
+                    generated += 1
+        
+        return generated
+
+
+_GENERAL_VOCABULARY = set(
+    AdviceCacheService.normalize_symptom(" ".join(COMMON_SYMPTOMS) + _GENERAL_WORDS).split()
+) | _NEGATION_WORDS
+
+
+async def _warm_cache():
+    from app.database.db import db
+    
+    await db.connect_db()
+    try:
+        await AdviceCacheService.load()
+        generated = await AdviceCacheService.warm_up()
+        print(f"Symptom advice cache warmed: {generated} new entries")
+    finally:
+        await db.close_db()
+
+
+if __name__ == "__main__":
+    # Offline warm-up: python -m app.services.advice_cache_service
+    import asyncio
+    asyncio.run(_warm_cache())
@@ -1,20 +1,152 @@
-from openai import OpenAI
-from typing import List, Dict
+from openai import APIConnectionError, APITimeoutError, RateLimitError, InternalServerError
+from typing import List, Dict, Optional, AsyncIterator
 from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import time
 
 from app.config import settings
 from app.models.healthlog_model import HealthLog
+from app.models.insight_model import HealthInsight
 from app.models.user_model import User
+from app.utils.token_utils import count_tokens
+from app.utils.resilience_utils import CircuitOpenError, SingleFlight, backoff_with_jitter
+from app.services.llm_provider import resolve_route, get_client, get_breaker
+from app.services.advice_cache_service import AdviceCacheService
+from app.services.trend_service import TrendService
+from app.services.telemetry_service import LLMTelemetryService
+from app.schemas.insight_schema import InsightContent, parse_insight
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# Errors worth retrying; anything else (bad request, auth) fails immediately
+RETRYABLE_ERRORS = (asyncio.TimeoutError, APITimeoutError, APIConnectionError, RateLimitError, InternalServerError)
+
+ai_semaphore = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
+route_semaphores: Dict[str, asyncio.Semaphore] = {}
+ai_singleflight = SingleFlight()
 
 
 class AIService:
     """AI-powered health insights service"""
     
     @staticmethod
-    async def analyze_health_trends(user: User, logs: List[HealthLog]) -> Dict:
-        """Analyze health trends and provide insights"""
+    def _route_semaphore(route: str) -> asyncio.Semaphore:
+        """Get the concurrency limit for a route"""
+        if route not in route_semaphores:
+            limit = settings.AI_ROUTE_CONCURRENCY.get(route, settings.AI_ROUTE_DEFAULT_CONCURRENCY)
+            route_semaphores[route] = asyncio.Semaphore(limit)
+        
+        return route_semaphores[route]
+    
+    
+    @staticmethod
+    async def _complete(route: str, user_id: Optional[str] = None, **request):
+        """Run a chat completion under concurrency limits, deadline, retries and circuit breaker"""
+        provider, model = resolve_route(route)
+        client = get_client(provider)
+        ai_breaker = get_breaker(provider)
+        request.setdefault("model", model)
+        started = time.perf_counter()
+        retries = 0
+        
+        def record(response=None, error: Optional[BaseException] = None, aborted: bool = False):
+            LLMTelemetryService.record(
+                route, request["model"], user_id,
+                usage=getattr(response, "usage", None),
+                latency=time.perf_counter() - started,
+                retries=retries,
+                error=error,
+                aborted=aborted
+            )
+        
+        try:
+            ai_breaker.before_call()
+        except CircuitOpenError as e:
+            record(error=e)
+            raise
+        
+        async def attempt_with_retries():
+            nonlocal retries
+            async with ai_semaphore, AIService._route_semaphore(route):
+                for attempt in range(settings.AI_MAX_RETRIES + 1):
+                    retries = attempt
+                    try:
+                        return await asyncio.wait_for(
+                            client.chat.completions.create(**request),
+                            timeout=settings.AI_ATTEMPT_TIMEOUT_SECONDS
+                        )
+                    except RETRYABLE_ERRORS:
+                        if attempt == settings.AI_MAX_RETRIES:
+                            raise
+                        await asyncio.sleep(backoff_with_jitter(
+                            attempt, settings.AI_RETRY_BASE_DELAY_SECONDS, settings.AI_RETRY_MAX_DELAY_SECONDS
+                        ))
+        
+        try:
+            response = await asyncio.wait_for(attempt_with_retries(), timeout=settings.AI_DEADLINE_SECONDS)
+        except RETRYABLE_ERRORS as e:
+            ai_breaker.record_failure()
+            record(error=e)
+            raise
+        except asyncio.CancelledError:
+            try:
+                ai_breaker.release()
+            finally:
+                # Cancelled or client-disconnected calls still count as completion calls
+                record(aborted=True)
+            raise
+        except Exception as e:
+            # Client-side errors say nothing about provider health
+            ai_breaker.release()
+            record(error=e)
+            raise
+        
+        ai_breaker.record_success()
+        record(response)
+        return response
+    
+    
+    @staticmethod
+    async def _latest_insight(user_id: str) -> Optional[HealthInsight]:
+        """Get the most recent saved insight for a user"""
+        return await HealthInsight.find(
+            HealthInsight.user_id == user_id
+        ).sort("-analysis_date").first_or_none()
+    
+    
+    @staticmethod
+    def _insight_result(insight: HealthInsight) -> Dict:
+        """Shape a stored insight like a fresh analysis result"""
+        return {
+            "insights": insight.insights_raw,
+            "structured": InsightContent(
+                trends=insight.trends,
+                correlations=insight.correlations,
+                recommendations=insight.recommendations,
+                alerts=insight.alerts
+            ).model_dump(),
+            "data_points_analyzed": insight.data_points_analyzed,
+            "analysis_date": insight.analysis_date.isoformat(),
+            "insight_id": str(insight.id),
+            "cached": True
+        }
+    
+    
+    @staticmethod
+    def _previous_insight_summary(insight: HealthInsight) -> str:
+        """Compact description of a previous analysis for incremental prompts"""
+        text = insight.insights_raw or ""
+        if len(text) > settings.AI_PREVIOUS_INSIGHT_MAX_CHARS:
+            text = text[:settings.AI_PREVIOUS_INSIGHT_MAX_CHARS] + "..."
+        
+        return (
+            f"Previous analysis ({insight.analysis_date.strftime('%Y-%m-%d')}, "
+            f"{insight.logs_analyzed_count} logs):\n{text}"
+        )
+    
+    
+    @staticmethod
+    async def analyze_health_trends(user: User, logs: List[HealthLog], incremental: bool = False, route: str = "insights", persist: bool = False, local_analysis: Optional[Dict] = None) -> Dict:
+        """Analyze health trends and provide insights (incremental analyses are always persisted)"""
         
         if not logs:
             return {
@@ -23,8 +155,42 @@ class AIService:
                 "correlations": []
             }
         
-        # Prepare data summary for AI
-        log_summary = AIService._prepare_log_summary(logs)
+        previous = None
+        new_logs = logs
+        
+        # Incremental: send only logs added or edited since the latest saved insight
+        if incremental:
+            previous = await AIService._latest_insight(str(user.id))
+            
+            if previous:
+                covered = set(previous.analyzed_log_ids)
+                new_logs = [
+                    log for log in logs
+                    if str(log.id) not in covered or log.updated_at > previous.analysis_date
+                ]
+                
+                if not new_logs:
+                    return AIService._insight_result(previous)
+        
+        # Deterministic facts are computed locally; the model only gets the fact sheet
+        if local_analysis is None:
+            local_analysis = TrendService.compute_facts(logs)
+        fact_sheet = TrendService.fact_sheet(local_analysis)
+        
+        if previous:
+            log_summary = AIService._prepare_log_summary(new_logs)
+            history_section = f"""{AIService._previous_insight_summary(previous)}
+
+Computed Facts (Last {len(logs)} entries):
+{fact_sheet}
+
+New Health Logs Since Then ({len(new_logs)} entries):
+{log_summary}
+
+Update the previous analysis with the new data."""
+        else:
+            history_section = f"""Computed Facts (Last {len(logs)} entries):
+{fact_sheet}"""
         
         # Create prompt
         prompt = f"""
@@ -36,8 +202,7 @@ Patient Information:
 - Allergies: {', '.join(user.allergies) if user.allergies else 'None'}
 - Chronic Conditions: {', '.join(user.chronic_conditions) if user.chronic_conditions else 'None'}
 
-Health Logs Summary (Last {len(logs)} entries):
-{log_summary}
+{history_section}
 
 Please provide:
 1. Key health trends observed
@@ -49,72 +214,181 @@ Format your response as JSON with keys: "trends", "correlations", "recommendatio
 """
         
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = await AIService._complete(
+                route,
+                user_id=str(user.id),
                 messages=[
                     {"role": "system", "content": "You are a helpful health analysis assistant. Provide clear, actionable insights."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.7,
-                max_tokens=800
+                max_tokens=800,
+                response_format={"type": "json_object"}
             )
             
             insights_text = response.choices[0].message.content
+            content = parse_insight(insights_text)
+            analysis_date = datetime.utcnow()
             
-            return {
+            result = {
                 "insights": insights_text,
+                "structured": content.model_dump() if content else None,
+                "local_analysis": local_analysis,
                 "data_points_analyzed": len(logs),
-                "analysis_date": datetime.utcnow().isoformat()
+                "analysis_date": analysis_date.isoformat()
             }
             
+            if incremental or persist:
+                insight = HealthInsight(
+                    user_id=str(user.id),
+                    patient_name=user.full_name,
+                    analyzed_log_ids=[str(log.id) for log in logs],
+                    logs_analyzed_count=len(logs),
+                    insights_raw=insights_text,
+                    data_points_analyzed=len(logs),
+                    ai_model_used=response.model,
+                    analysis_date=analysis_date,
+                    created_at=analysis_date,
+                    updated_at=analysis_date,
+                    **(content.model_dump() if content else {})
+                )
+                await insight.insert()
+                
+                result["insight_id"] = str(insight.id)
+            
+            if incremental:
+                result["new_logs_analyzed"] = len(new_logs)
+            
+            return result
+            
         except Exception as e:
+            # Locally computed trends still answer the request
             return {
                 "error": f"AI analysis failed: {str(e)}",
-                "insights": "Unable to generate insights at this time."
+                "insights": "Unable to generate AI insights at this time. Showing locally computed trends.",
+                "local_analysis": local_analysis,
+                "data_points_analyzed": len(logs)
             }
     
     
     @staticmethod
-    def _prepare_log_summary(logs: List[HealthLog]) -> str:
-        """Prepare a text summary of health logs"""
-        summary_lines = []
+    async def analyze_health_trends_shared(endpoint: str, user: User, logs: List[HealthLog], incremental: bool = False, persist: bool = False, local_analysis: Optional[Dict] = None) -> Dict:
+        """Analyze health trends, sharing one upstream call between identical concurrent requests"""
+        # endpoint only namespaces the coalescing key; it is never passed on as the model route
+        log_ids = ",".join(sorted(str(log.id) for log in logs))
+        key = hashlib.sha256(f"{endpoint}|{user.id}|{incremental}|{persist}|{log_ids}".encode()).hexdigest()
         
-        for i, log in enumerate(logs[:30], 1):  # Last 30 logs
-            log_info = f"Day {i} ({log.log_date.strftime('%Y-%m-%d')}):"
-            
-            details = []
-            if log.temperature:
-                details.append(f"Temp: {log.temperature}°F")
-            if log.sleep_hours:
-                details.append(f"Sleep: {log.sleep_hours}hrs")
-            if log.mood:
-                details.append(f"Mood: {log.mood.value}")
-            
-            symptoms = []
-            if log.has_fever:
-                symptoms.append("fever")
-            if log.has_headache:
-                symptoms.append("headache")
-            if log.has_cough:
-                symptoms.append("cough")
-            if log.has_fatigue:
-                symptoms.append("fatigue")
-            
-            if symptoms:
-                details.append(f"Symptoms: {', '.join(symptoms)}")
-            
-            if details:
-                log_info += " " + ", ".join(details)
-            
-            summary_lines.append(log_info)
+        return await ai_singleflight.do(
+            key,
+            lambda: AIService.analyze_health_trends(
+                user, logs, incremental=incremental, persist=persist, local_analysis=local_analysis
+            )
+        )
+    
+    
+    @staticmethod
+    async def stream_health_trends(endpoint: str, user: User, logs: List[HealthLog], incremental: bool = False) -> AsyncIterator[Dict]:
+        """Yield the locally computed facts straight away, then the AI analysis once it arrives"""
+        local_analysis = TrendService.compute_facts(logs)
+        yield {"type": "facts", "data_points_analyzed": len(logs), "local_analysis": local_analysis}
         
-        return "\n".join(summary_lines)
+        result = await AIService.analyze_health_trends_shared(
+            endpoint, user, logs, incremental=incremental, local_analysis=local_analysis
+        )
+        yield {"type": "error" if "error" in result else "insight", **result}
+    
+    
+    # Compact log table columns: (header, value getter)
+    LOG_COLUMNS = [
+        ("temp", lambda log: log.temperature),
+        ("bp", lambda log: f"{log.blood_pressure_systolic}/{log.blood_pressure_diastolic}"
+            if log.blood_pressure_systolic and log.blood_pressure_diastolic else None),
+        ("hr", lambda log: log.heart_rate),
+        ("spo2", lambda log: log.oxygen_saturation),
+        ("wt", lambda log: log.weight),
+        ("sugar", lambda log: log.blood_sugar),
+        ("sleep", lambda log: log.sleep_hours),
+        ("sq", lambda log: log.sleep_quality),
+        ("stress", lambda log: log.stress_level),
+        ("anx", lambda log: log.anxiety_level),
+        ("water", lambda log: log.water_intake),
+        ("ex", lambda log: log.exercise_minutes),
+        ("mood", lambda log: log.mood.value if log.mood else None),
+        ("pain", lambda log: log.pain_level.value if log.pain_level else None),
+        ("sx", lambda log: "".join(
+            code for code, flag in [
+                ("F", log.has_fever), ("C", log.has_cough), ("H", log.has_headache),
+                ("T", log.has_fatigue), ("B", log.has_body_pain), ("N", log.has_nausea)
+            ] if flag
+        ) or "-")
+    ]
+    
+    
+    @staticmethod
+    def _encode_log_table(logs: List[HealthLog]) -> str:
+        """Encode logs (oldest first) as a table; blank cells repeat the previous row"""
+        rows = [[getter(log) for _, getter in AIService.LOG_COLUMNS] for log in logs]
+        
+        # Drop columns with no data at all
+        keep = [i for i in range(len(AIService.LOG_COLUMNS)) if any(row[i] is not None for row in rows)]
+        
+        lines = [
+            "Blank cell = same as previous row. temp in C. sx: F=fever C=cough H=headache T=fatigue B=body pain N=nausea",
+            "|".join(["date"] + [AIService.LOG_COLUMNS[i][0] for i in keep])
+        ]
+        
+        previous = None
+        for log, row in zip(logs, rows):
+            cells = [log.log_date.strftime("%Y-%m-%d")]
+            for i in keep:
+                value = row[i]
+                changed = previous is None or value != previous[i]
+                cells.append("" if not changed else ("?" if value is None else str(value)))
+            lines.append("|".join(cells))
+            previous = row
+        
+        return "\n".join(lines)
+    
+    
+    @staticmethod
+    def _prepare_log_summary(logs: List[HealthLog], token_budget: Optional[int] = None) -> str:
+        """Prepare a compact table of the most recent logs that fits the token budget"""
+        token_budget = token_budget or settings.AI_LOG_TOKEN_BUDGET
+        newest_first = sorted(logs, key=lambda log: log.log_date, reverse=True)
+        
+        def encode(count: int) -> str:
+            return AIService._encode_log_table(list(reversed(newest_first[:count])))
+        
+        # Binary search for the most days that fit
+        low, high = 1, len(newest_first)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(encode(middle)) <= token_budget:
+                low = middle
+            else:
+                high = middle - 1
+        
+        summary = encode(low)
+        if low < len(newest_first):
+            summary += f"\n({len(newest_first) - low} older entries omitted)"
+        
+        return summary
     
     
     @staticmethod
-    async def get_symptom_advice(symptom: str, severity: str = "mild") -> Dict:
+    async def get_symptom_advice(symptom: str, severity: str = "mild", user_id: Optional[str] = None) -> Dict:
         """Get AI advice for specific symptom"""
         
+        cached_advice = AdviceCacheService.lookup(symptom, severity)
+        if cached_advice is not None:
+            return {
+                "symptom": symptom,
+                "severity": severity,
+                "advice": cached_advice,
+                "cached": True,
+                "disclaimer": "This is general information only. Consult a healthcare professional for medical advice."
+            }
+        
         prompt = f"""
 A patient is experiencing {symptom} with {severity} severity.
 
@@ -128,8 +402,9 @@ Keep it concise and practical. Format as JSON with keys: "causes", "remedies", "
 """
         
         try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            response = await AIService._complete(
+                "symptom_advice",
+                user_id=user_id,
                 messages=[
                     {"role": "system", "content": "You are a helpful medical information assistant. Provide general health advice."},
                     {"role": "user", "content": prompt}
@@ -140,6 +415,11 @@ Keep it concise and practical. Format as JSON with keys: "causes", "remedies", "
             
             advice = response.choices[0].message.content
             
+            try:
+                await AdviceCacheService.store(symptom, severity, advice, response.model)
+            except Exception as e:
+                print(f"Warning: Failed to cache symptom advice: {e}")
+            
             return {
                 "symptom": symptom,
                 "severity": severity,
@@ -154,8 +434,8 @@ Keep it concise and practical. Format as JSON with keys: "causes", "remedies", "
     
     
     @staticmethod
-    async def chat_with_health_assistant(user: User, message: str, conversation_history: List[Dict] = None) -> Dict:
-        """Chat with AI health assistant"""
+    def _build_chat_messages(user: User, message: str, conversation_history: List[Dict] = None, summary: Optional[str] = None) -> List[Dict]:
+        """Build the chat prompt from summary, history and the new message"""
         
         if conversation_history is None:
             conversation_history = []
@@ -168,16 +448,29 @@ Keep it concise and practical. Format as JSON with keys: "causes", "remedies", "
             Be empathetic and supportive."""}
         ]
         
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+        
         # Add conversation history
-        for msg in conversation_history[-5:]:  # Last 5 messages
+        for msg in conversation_history[-settings.CHAT_RECENT_MESSAGES:]:
             messages.append(msg)
         
         # Add current message
         messages.append({"role": "user", "content": message})
         
+        return messages
+    
+    
+    @staticmethod
+    async def chat_with_health_assistant(user: User, message: str, conversation_history: List[Dict] = None, summary: Optional[str] = None) -> Dict:
+        """Chat with AI health assistant"""
+        
+        messages = AIService._build_chat_messages(user, message, conversation_history, summary)
+        
         try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            response = await AIService._complete(
+                "chat",
+                user_id=str(user.id),
                 messages=messages,
                 temperature=0.8,
                 max_tokens=300
@@ -195,3 +488,108 @@ Keep it concise and practical. Format as JSON with keys: "causes", "remedies", "
                 "error": f"Chat failed: {str(e)}",
                 "response": "I'm having trouble responding right now. Please try again."
             }
+    
+    
+    @staticmethod
+    async def stream_chat_with_health_assistant(user: User, message: str, conversation_history: List[Dict] = None, summary: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Chat with AI health assistant, yielding tokens as the model emits them"""
+        
+        messages = AIService._build_chat_messages(user, message, conversation_history, summary)
+        started = time.perf_counter()
+        deadline = started + settings.AI_DEADLINE_SECONDS
+        time_to_first_token = None
+        
+        async def within_deadline(awaitable, timeout: float, what: str):
+            """Await with a timeout that never runs past the overall deadline"""
+            try:
+                return await asyncio.wait_for(awaitable, timeout=max(0, min(timeout, deadline - time.perf_counter())))
+            except asyncio.TimeoutError:
+                raise asyncio.TimeoutError(f"{what} timed out") from None
+        
+        provider, model = resolve_route("chat")
+        client = get_client(provider)
+        ai_breaker = get_breaker(provider)
+        
+        usage = None
+        
+        def record(error: Optional[BaseException] = None, aborted: bool = False):
+            LLMTelemetryService.record(
+                "chat", model, str(user.id),
+                usage=usage,
+                latency=time.perf_counter() - started,
+                time_to_first_token=time_to_first_token,
+                error=error,
+                aborted=aborted
+            )
+        
+        try:
+            ai_breaker.before_call()
+        except CircuitOpenError as e:
+            record(error=e)
+            yield {"type": "error", "error": f"Chat failed: {str(e)}"}
+            return
+        
+        try:
+            async with ai_semaphore, AIService._route_semaphore("chat"):
+                stream = await within_deadline(
+                    client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=0.8,
+                        max_tokens=300,
+                        stream=True,
+                        stream_options={"include_usage": True}
+                    ),
+                    settings.AI_ATTEMPT_TIMEOUT_SECONDS,
+                    "opening the AI stream"
+                )
+                
+                # Closing the stream aborts the upstream request if the client goes away
+                try:
+                    chunks = stream.__aiter__()
+                    while True:
+                        # A stalled provider must not hold the semaphores indefinitely
+                        try:
+                            chunk = await within_deadline(chunks.__anext__(), settings.AI_STREAM_IDLE_SECONDS, "waiting for the next AI chunk")
+                        except StopAsyncIteration:
+                            break
+                        
+                        # The final chunk carries usage and no choices
+                        if chunk.usage is not None:
+                            usage = chunk.usage
+                        
+                        content = chunk.choices[0].delta.content if chunk.choices else None
+                        if not content:
+                            continue
+                        
+                        if time_to_first_token is None:
+                            time_to_first_token = time.perf_counter() - started
+                        
+                        yield {"type": "token", "content": content}
+                finally:
+                    await stream.close()
+        except RETRYABLE_ERRORS as e:
+            ai_breaker.record_failure()
+            record(error=e)
+            yield {"type": "error", "error": f"Chat failed: {str(e)}"}
+            return
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client disconnected mid-stream: an aborted call, not a failure
+            ai_breaker.release()
+            record(aborted=True)
+            raise
+        except Exception as e:
+            ai_breaker.release()
+            record(error=e)
+            yield {"type": "error", "error": f"Chat failed: {str(e)}"}
+            return
+        
+        ai_breaker.record_success()
+        record()
+        
+        yield {
+            "type": "done",
+            "time_to_first_token_ms": round(time_to_first_token * 1000, 1) if time_to_first_token is not None else None,
+            "total_time_ms": round((time.perf_counter() - started) * 1000, 1),
+            "timestamp": datetime.utcnow().isoformat()
+        }
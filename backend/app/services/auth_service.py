@@ -1,10 +1,14 @@
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
 from typing import Optional
+import uuid
 
 from app.models.user_model import User, UserRole
+from app.models.token_model import RefreshToken
 from app.schemas.user_schema import UserRegister, UserLogin, TokenResponse, UserResponse
-from app.utils.auth_utils import hash_password, verify_password, create_access_token, create_refresh_token
+from app.utils.auth_utils import hash_password_async, verify_password_async, create_access_token, create_refresh_token, verify_token
+from app.utils.role_utils import invalidate_cached_user
+from app.services.login_tracker_service import LoginTrackerService
 from app.config import settings
 
 
@@ -24,7 +28,7 @@ class AuthService:
             )
         
         # Hash password
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await hash_password_async(user_data.password)
         
         # Create user
         user = User(
@@ -39,31 +43,7 @@ class AuthService:
         
         await user.insert()
         
-        # Create tokens
-        access_token = create_access_token(
-            data={"sub": str(user.id), "email": user.email, "role": user.role.value}
-        )
-        
-        refresh_token = create_refresh_token(
-            data={"sub": str(user.id)}
-        )
-        
-        # Create user response
-        user_response = UserResponse(
-            id=str(user.id),
-            email=user.email,
-            full_name=user.full_name,
-            phone=user.phone,
-            role=user.role,
-            is_active=user.is_active,
-            created_at=user.created_at
-        )
-        
-        return TokenResponse(
-            access_token=access_token,
-            token_type="bearer",
-            user=user_response
-        )
+        return await AuthService._issue_tokens(user)
     
     
     @staticmethod
@@ -80,7 +60,7 @@ class AuthService:
             )
         
         # Verify password
-        if not verify_password(login_data.password, user.hashed_password):
+        if not await verify_password_async(login_data.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password"
@@ -93,19 +73,33 @@ class AuthService:
                 detail="Account is inactive. Please contact support."
             )
         
-        # Update last login
-        user.last_login = datetime.utcnow()
-        await user.save()
+        # Update last login (batched, written by LoginTrackerService)
+        LoginTrackerService.record_login(str(user.id))
         
-        # Create tokens
+        return await AuthService._issue_tokens(user)
+    
+    
+    @staticmethod
+    async def _issue_tokens(user: User, family_id: Optional[str] = None, jti: Optional[str] = None) -> TokenResponse:
+        """Create an access token and a tracked refresh token for a user"""
         access_token = create_access_token(
             data={"sub": str(user.id), "email": user.email, "role": user.role.value}
         )
         
+        jti = jti or uuid.uuid4().hex
+        family_id = family_id or uuid.uuid4().hex
+        
         refresh_token = create_refresh_token(
-            data={"sub": str(user.id)}
+            data={"sub": str(user.id), "jti": jti, "fam": family_id}
         )
         
+        await RefreshToken(
+            jti=jti,
+            user_id=str(user.id),
+            family_id=family_id,
+            expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        ).insert()
+        
         # Create user response
         user_response = UserResponse(
             id=str(user.id),
@@ -119,11 +113,95 @@ class AuthService:
         
         return TokenResponse(
             access_token=access_token,
+            refresh_token=refresh_token,
             token_type="bearer",
             user=user_response
         )
     
     
+    @staticmethod
+    async def refresh_tokens(refresh_token: str) -> TokenResponse:
+        """Rotate a refresh token and issue a new access token"""
+        payload = verify_token(refresh_token)
+        jti = payload.get("jti")
+        
+        if payload.get("type") != "refresh" or jti is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token"
+            )
+        
+        # Claim the token atomically so concurrent refreshes cannot both succeed
+        new_jti = uuid.uuid4().hex
+        stored = await RefreshToken.get_motor_collection().find_one_and_update(
+            {"jti": jti, "revoked": False},
+            {"$set": {"revoked": True, "replaced_by": new_jti, "used_at": datetime.utcnow()}}
+        )
+        
+        if stored is None:
+            reused = await RefreshToken.find_one(RefreshToken.jti == jti)
+            
+            if reused and await AuthService._within_reuse_grace(reused):
+                # Concurrent refresh (another tab or request) raced the rotation: branch the family
+                user = await User.get(reused.user_id)
+                if user and user.is_active:
+                    return await AuthService._issue_tokens(user, family_id=reused.family_id)
+            
+            # Unknown or already rotated: treat reuse as theft and kill the whole family
+            if reused:
+                await RefreshToken.find(
+                    RefreshToken.family_id == reused.family_id
+                ).update({"$set": {"revoked": True}})
+            
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Refresh token has been revoked. Please log in again."
+            )
+        
+        user = await User.get(stored["user_id"])
+        
+        if not user or not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Account is inactive or no longer exists"
+            )
+        
+        return await AuthService._issue_tokens(user, family_id=stored["family_id"], jti=new_jti)
+    
+    
+    @staticmethod
+    async def _within_reuse_grace(token: RefreshToken) -> bool:
+        """Whether a revoked token was rotated moments ago in a family that is still live"""
+        if token.replaced_by is None or token.used_at is None:
+            return False
+        
+        if datetime.utcnow() - token.used_at > timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS):
+            return False
+        
+        # Logout revokes the whole family, so a live token means the session is still valid
+        live = await RefreshToken.find_one(
+            RefreshToken.family_id == token.family_id,
+            RefreshToken.revoked == False
+        )
+        return live is not None
+    
+    
+    @staticmethod
+    async def revoke_refresh_token(refresh_token: str) -> None:
+        """Revoke every token in the refresh token's family (logout)"""
+        try:
+            payload = verify_token(refresh_token, allow_expired=True)
+        except HTTPException:
+            return
+        
+        family_id = payload.get("fam")
+        
+        if payload.get("type") == "refresh" and family_id:
+            await RefreshToken.find(
+                RefreshToken.family_id == family_id
+            ).update({"$set": {"revoked": True}})
+    
+    
     @staticmethod
     async def get_user_profile(user_id: str) -> User:
         """Get user profile by ID"""
@@ -157,6 +235,28 @@ class AuthService:
         user.updated_at = datetime.utcnow()
         await user.save()
         
+        invalidate_cached_user(user_id)
+        
+        return user
+    
+    
+    @staticmethod
+    async def set_user_active(user_id: str, is_active: bool) -> User:
+        """Activate or deactivate a user account"""
+        user = await User.get(user_id)
+        
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        
+        user.is_active = is_active
+        user.updated_at = datetime.utcnow()
+        await user.save()
+        
+        invalidate_cached_user(user_id)
+        
         return user
     
     
@@ -171,7 +271,7 @@ class AuthService:
         if not existing_admin:
             admin = User(
                 email=admin_email,
-                hashed_password=hash_password(settings.ADMIN_PASSWORD),
+                hashed_password=await hash_password_async(settings.ADMIN_PASSWORD),
                 full_name="System Administrator",
                 role=UserRole.ADMIN,
                 is_active=True,
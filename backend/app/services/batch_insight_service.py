@@ -0,0 +1,287 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi import HTTPException, status
+from beanie.operators import In
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from typing import Dict, Tuple, Optional
+
+from app.config import settings
+from app.models.batch_job_model import InsightBatchJob, JobStatus
+from app.models.healthlog_model import HealthLog
+from app.models.user_model import User, UserRole
+from app.services.ai_service import AIService
+
+# Identifies this worker process when claiming jobs (every uvicorn worker resumes jobs at startup)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class BatchInsightService:
+    """Resumable insight generation across a doctor's patient panel"""
+    
+    _tasks: Dict[str, asyncio.Task] = {}
+    _run_started: Dict[str, float] = {}  # job_id -> perf_counter when this process picked it up
+    
+    @staticmethod
+    async def start_job(doctor: User, days: int = 30) -> InsightBatchJob:
+        """Create a batch job for all of the doctor's patients (reuses an unfinished one)"""
+        active = await BatchInsightService._active_job(doctor)
+        
+        if not active:
+            patients = await User.find(
+                User.assigned_doctor_id == str(doctor.id),
+                User.role == UserRole.PATIENT
+            ).to_list()
+            
+            job = InsightBatchJob(
+                doctor_id=str(doctor.id),
+                patient_ids=[str(patient.id) for patient in patients],
+                days=days
+            )
+            
+            try:
+                await job.insert()
+                BatchInsightService._launch(job)
+                return job
+            except DuplicateKeyError:
+                # A concurrent request created the doctor's active job first
+                active = await BatchInsightService._active_job(doctor)
+                if not active:
+                    raise
+        
+        if str(active.id) not in BatchInsightService._tasks:
+            BatchInsightService._launch(active)
+        return active
+    
+    
+    @staticmethod
+    async def _active_job(doctor: User) -> Optional[InsightBatchJob]:
+        return await InsightBatchJob.find_one(
+            InsightBatchJob.doctor_id == str(doctor.id),
+            In(InsightBatchJob.status, [JobStatus.PENDING, JobStatus.RUNNING])
+        )
+    
+    
+    @staticmethod
+    async def get_job(doctor: User, job_id: str) -> InsightBatchJob:
+        """Get one of the doctor's batch jobs"""
+        job = await InsightBatchJob.get(job_id)
+        
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Batch job not found"
+            )
+        
+        if job.doctor_id != str(doctor.id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+        
+        return job
+    
+    
+    @staticmethod
+    def progress(job: InsightBatchJob) -> Dict:
+        """Progress and throughput of a job"""
+        total = len(job.patient_ids)
+        processed = len(job.processed_patient_ids)
+        
+        elapsed = job.processing_seconds
+        run_started = BatchInsightService._run_started.get(str(job.id))
+        if run_started is not None and job.status == JobStatus.RUNNING:
+            elapsed += time.perf_counter() - run_started
+        
+        return {
+            "job_id": str(job.id),
+            "status": job.status,
+            "total_patients": total,
+            "processed": processed,
+            "generated": job.generated_count,
+            "skipped": job.skipped_count,
+            "failed": len(job.failed),
+            "failures": job.failed,
+            "percent_complete": round(100 * processed / total, 1) if total else 100.0,
+            "elapsed_seconds": round(elapsed, 2),
+            "patients_per_minute": round(60 * processed / elapsed, 2) if elapsed else None,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at
+        }
+    
+    
+    @staticmethod
+    async def _process_patient(patient_id: str, days: int) -> Tuple[str, Optional[str]]:
+        """Generate one patient's insight: returns (outcome, error)"""
+        patient = await User.get(patient_id)
+        if not patient:
+            return "skipped", None
+        
+        logs = await HealthLog.find(
+            HealthLog.user_id == patient_id
+        ).sort("-log_date").limit(days).to_list()
+        
+        if not logs:
+            return "skipped", None
+        
+        # Incremental analysis returns the saved insight when nothing changed since it
+        result = await AIService.analyze_health_trends(patient, logs, incremental=True, route="batch_insights")
+        
+        if "error" in result:
+            return "failed", result["error"]
+        
+        return ("skipped", None) if result.get("cached") else ("generated", None)
+    
+    
+    @staticmethod
+    def _lease_expiry() -> datetime:
+        return datetime.utcnow() + timedelta(seconds=settings.BATCH_INSIGHT_LEASE_SECONDS)
+    
+    
+    @staticmethod
+    async def _claim(job_id: str) -> Optional[InsightBatchJob]:
+        """Atomically take an unfinished job unless another live worker holds it"""
+        now = datetime.utcnow()
+        claimed = await InsightBatchJob.get_motor_collection().find_one_and_update(
+            {
+                "_id": ObjectId(job_id),
+                "status": {"$in": [JobStatus.PENDING, JobStatus.RUNNING]},
+                "$or": [{"owner": None}, {"owner": WORKER_ID}, {"lease_expires_at": {"$lt": now}}]
+            },
+            [{"$set": {
+                "status": JobStatus.RUNNING,
+                "owner": WORKER_ID,
+                "lease_expires_at": BatchInsightService._lease_expiry(),
+                "started_at": {"$ifNull": ["$started_at", now]}
+            }}],
+            return_document=ReturnDocument.AFTER
+        )
+        
+        return InsightBatchJob.model_validate(claimed) if claimed else None
+    
+    
+    @staticmethod
+    async def _renew_lease(job_id: str):
+        """Keep the claim alive while the job runs"""
+        while True:
+            await asyncio.sleep(settings.BATCH_INSIGHT_LEASE_SECONDS / 3)
+            await InsightBatchJob.get_motor_collection().update_one(
+                {"_id": ObjectId(job_id), "owner": WORKER_ID},
+                {"$set": {"lease_expires_at": BatchInsightService._lease_expiry()}}
+            )
+    
+    
+    @staticmethod
+    async def _run(job_id: str):
+        """Work through the job's remaining patients with bounded concurrency"""
+        job = await BatchInsightService._claim(job_id)
+        if not job:
+            # Finished, or another worker holds it
+            return
+        
+        collection = InsightBatchJob.get_motor_collection()
+        done = set(job.processed_patient_ids)
+        remaining = [patient_id for patient_id in job.patient_ids if patient_id not in done]
+        semaphore = asyncio.Semaphore(settings.BATCH_INSIGHT_CONCURRENCY)
+        
+        started = time.perf_counter()
+        BatchInsightService._run_started[job_id] = started
+        lease = asyncio.create_task(BatchInsightService._renew_lease(job_id))
+        
+        async def process(patient_id: str):
+            async with semaphore:
+                try:
+                    outcome, error = await BatchInsightService._process_patient(patient_id, job.days)
+                except Exception as e:
+                    outcome, error = "failed", str(e)
+            
+            update = {"$addToSet": {"processed_patient_ids": patient_id}}
+            if outcome == "failed":
+                update["$set"] = {f"failed.{patient_id}": error}
+            else:
+                update["$inc"] = {f"{outcome}_count": 1}
+            
+            # The $ne guard keeps counters exact if a patient is ever recorded twice
+            await collection.update_one(
+                {"_id": job.id, "processed_patient_ids": {"$ne": patient_id}},
+                update
+            )
+        
+        final_status = JobStatus.COMPLETED
+        try:
+            await asyncio.gather(*(process(patient_id) for patient_id in remaining))
+        except asyncio.CancelledError:
+            # Shutdown: leave the job RUNNING but unowned so the next startup resumes it
+            await collection.update_one(
+                {"_id": job.id, "owner": WORKER_ID},
+                {
+                    "$set": {"owner": None, "lease_expires_at": None},
+                    "$inc": {"processing_seconds": time.perf_counter() - started}
+                }
+            )
+            raise
+        except Exception as e:
+            print(f"Warning: Insight batch job {job_id} failed: {e}")
+            final_status = JobStatus.FAILED
+        finally:
+            lease.cancel()
+            BatchInsightService._run_started.pop(job_id, None)
+        
+        elapsed = time.perf_counter() - started
+        await collection.update_one(
+            {"_id": job.id},
+            {
+                "$set": {
+                    "status": final_status,
+                    "active": False,
+                    "finished_at": datetime.utcnow(),
+                    "owner": None,
+                    "lease_expires_at": None
+                },
+                "$inc": {"processing_seconds": elapsed}
+            }
+        )
+        
+        if remaining:
+            print(
+                f"Insight batch job {job_id}: {len(remaining)} patients in {elapsed:.1f}s "
+                f"({60 * len(remaining) / elapsed:.1f}/min)"
+            )
+    
+    
+    @staticmethod
+    def _launch(job: InsightBatchJob):
+        job_id = str(job.id)
+        task = asyncio.create_task(BatchInsightService._run(job_id))
+        BatchInsightService._tasks[job_id] = task
+        task.add_done_callback(lambda _: BatchInsightService._tasks.pop(job_id, None))
+    
+    
+    @staticmethod
+    async def resume_jobs() -> int:
+        """Restart jobs left unfinished by a previous process (each is claimed by one worker only)"""
+        jobs = await InsightBatchJob.find(
+            In(InsightBatchJob.status, [JobStatus.PENDING, JobStatus.RUNNING])
+        ).to_list()
+        
+        for job in jobs:
+            BatchInsightService._launch(job)
+        
+        return len(jobs)
+    
+    
+    @staticmethod
+    async def stop():
+        """Cancel running jobs; their progress is kept for the next startup"""
+        tasks = list(BatchInsightService._tasks.values())
+        
+        for task in tasks:
+            task.cancel()
+        
+        await asyncio.gather(*tasks, return_exceptions=True)
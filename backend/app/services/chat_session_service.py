@@ -0,0 +1,163 @@
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from typing import List, Dict, Optional
+
+from app.config import settings
+from app.models.chat_model import ChatSession
+
+
+class ChatSessionService:
+    """Persisted chat sessions that keep recent turns plus a rolling summary"""
+    
+    # Background summary folds keyed by session id (at most one per session)
+    _tasks: Dict[str, asyncio.Task] = {}
+    
+    @staticmethod
+    async def get_or_create(user_id: str, session_id: Optional[str] = None) -> ChatSession:
+        """Load the user's session, or start a new one"""
+        if session_id is None:
+            session = ChatSession(user_id=user_id)
+            await session.insert()
+            return session
+        
+        session = await ChatSession.get(session_id)
+        
+        if not session:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Chat session not found"
+            )
+        
+        if session.user_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+        
+        return session
+    
+    
+    @staticmethod
+    async def delete(user_id: str, session_id: str) -> None:
+        """Delete one of the user's sessions"""
+        result = None
+        if ObjectId.is_valid(session_id):
+            result = await ChatSession.get_motor_collection().delete_one(
+                {"_id": ObjectId(session_id), "user_id": user_id}
+            )
+        
+        if result is None or result.deleted_count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Chat session not found"
+            )
+    
+    
+    @staticmethod
+    async def record_turn(session: ChatSession, user_message: str, assistant_message: str) -> None:
+        """Append a turn atomically; folding old turns into the summary happens in the background"""
+        updated = await ChatSession.get_motor_collection().find_one_and_update(
+            {"_id": session.id},
+            {
+                "$push": {"recent_messages": {"$each": [
+                    {"role": "user", "content": user_message},
+                    {"role": "assistant", "content": assistant_message}
+                ]}},
+                "$inc": {"turn_count": 1},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            projection={"recent_messages": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if updated and len(updated["recent_messages"]) > settings.CHAT_RECENT_MESSAGES:
+            ChatSessionService._schedule_fold(str(session.id))
+    
+    
+    @staticmethod
+    def _schedule_fold(session_id: str) -> None:
+        """Summarize after the reply has gone out, so the model call never delays it"""
+        if session_id in ChatSessionService._tasks:
+            return
+        
+        task = asyncio.create_task(ChatSessionService._fold(session_id))
+        ChatSessionService._tasks[session_id] = task
+        task.add_done_callback(lambda _: ChatSessionService._tasks.pop(session_id, None))
+    
+    
+    @staticmethod
+    async def _fold(session_id: str) -> bool:
+        """Fold the oldest messages into the summary, unless another fold got there first"""
+        session = await ChatSession.get(session_id)
+        limit = settings.CHAT_RECENT_MESSAGES
+        
+        if session is None or len(session.recent_messages) <= limit:
+            return False
+        
+        # Fold down to half the limit so summarization runs every few turns, not every turn
+        keep = max(2, limit // 2)
+        drop = len(session.recent_messages) - keep
+        
+        summary = await ChatSessionService._summarize(session.summary, session.recent_messages[:drop], session.user_id)
+        if summary is None:
+            if len(session.recent_messages) <= 2 * limit:
+                return False
+            # Summarizer unavailable: keep the prompt bounded anyway
+            summary = session.summary
+            drop = len(session.recent_messages) - limit
+        
+        # Turns appended meanwhile sit after the dropped prefix and survive the slice
+        result = await ChatSession.get_motor_collection().update_one(
+            {"_id": session.id, "summary_version": session.summary_version or {"$in": [0, None]}},
+            [{"$set": {
+                "summary": summary,
+                "summary_version": session.summary_version + 1,
+                "recent_messages": {"$slice": ["$recent_messages", drop, {"$size": "$recent_messages"}]}
+            }}]
+        )
+        return result.modified_count == 1
+    
+    
+    @staticmethod
+    async def _summarize(previous_summary: Optional[str], messages: List[Dict], user_id: Optional[str] = None) -> Optional[str]:
+        """Merge older messages into the running summary (None if the model call fails)"""
+        from app.services.ai_service import AIService
+        
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = f"""
+Current summary of the conversation so far:
+{previous_summary or '(none)'}
+
+New messages to merge into the summary:
+{transcript}
+
+Write an updated summary in at most {settings.CHAT_SUMMARY_MAX_WORDS} words. Keep symptoms, health details,
+advice already given and open questions. Return only the summary.
+"""
+
+        try:
+            response = await AIService._complete(
+                "chat_summary",
+                user_id=user_id,
+                messages=[
+                    {"role": "system", "content": "You summarize health assistant conversations accurately and concisely."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.2,
+                max_tokens=settings.CHAT_SUMMARY_MAX_WORDS * 2
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"Warning: Chat summarization failed: {e}")
+            return None
+    
+    
+    @staticmethod
+    async def list_sessions(user_id: str, limit: int = 20) -> List[ChatSession]:
+        """Get the user's most recently active sessions"""
+        return await ChatSession.find(
+            ChatSession.user_id == user_id
+        ).sort("-updated_at").limit(limit).to_list()
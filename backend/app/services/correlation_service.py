@@ -0,0 +1,201 @@
+import numpy as np
+from scipy import stats
+from datetime import datetime, timedelta
+from typing import List, Dict, Tuple
+
+from app.config import settings
+from app.models.healthlog_model import HealthLog
+from app.services.trend_service import TrendService, METRIC_FIELDS, SYMPTOM_FIELDS
+from app.utils.cache_utils import TTLCache
+
+CORRELATION_FIELDS = METRIC_FIELDS + SYMPTOM_FIELDS
+
+# user_id -> {(days, max_lag): result}
+correlation_cache = TTLCache(
+    maxsize=settings.CORRELATION_CACHE_MAX_SIZE,
+    ttl=settings.CORRELATION_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_correlations(user_id: str) -> None:
+    """Drop cached correlations after a user's logs change"""
+    correlation_cache.invalidate(user_id)
+
+
+def _pairwise_pearson(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pearson r and sample count for every column of a against every column of b.
+    
+    Each pair uses only the rows where both values are present, computed for all
+    pairs at once from masked sums.
+    """
+    mask_a = ~np.isnan(a)
+    mask_b = ~np.isnan(b)
+    
+    # Centering first keeps the sums small and avoids cancellation
+    a = np.where(mask_a, a - np.nanmean(a, axis=0), 0.0)
+    b = np.where(mask_b, b - np.nanmean(b, axis=0), 0.0)
+    present_a = mask_a.astype(float)
+    present_b = mask_b.astype(float)
+    
+    n = present_a.T @ present_b
+    sum_a = a.T @ present_b
+    sum_b = present_a.T @ b
+    sum_aa = (a ** 2).T @ present_b
+    sum_bb = present_a.T @ (b ** 2)
+    sum_ab = a.T @ b
+    
+    var_a = n * sum_aa - sum_a ** 2
+    var_b = n * sum_bb - sum_b ** 2
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = (n * sum_ab - sum_a * sum_b) / np.sqrt(var_a * var_b)
+    
+    # A field that is constant over the shared days has no defined correlation
+    constant = (var_a <= 1e-9 * n * sum_aa) | (var_b <= 1e-9 * n * sum_bb)
+    r[constant] = np.nan
+    
+    return np.clip(r, -1.0, 1.0), n.astype(int)
+
+
+def _pairwise_spearman(a: np.ndarray, b: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """Spearman rho for column rows[i] of a against column cols[i] of b.
+    
+    Each pair is ranked over only the rows where both values are present, so a
+    day missing from one field doesn't shift the other field's ranks.
+    """
+    rho = np.full(len(rows), np.nan)
+    
+    for i, (row, col) in enumerate(zip(rows, cols)):
+        x, y = a[:, row], b[:, col]
+        both = ~np.isnan(x) & ~np.isnan(y)
+        
+        r, _ = _pairwise_pearson(
+            stats.rankdata(x[both])[:, None],
+            stats.rankdata(y[both])[:, None]
+        )
+        rho[i] = r[0, 0]
+    
+    return rho
+
+
+def _p_values(r: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Two-sided p-values for correlation coefficients (t-test with n - 2 dof)"""
+    dof = np.maximum(n - 2, 1)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = r * np.sqrt(dof / np.maximum(1.0 - r ** 2, 1e-12))
+    
+    return 2 * stats.t.sf(np.abs(t), dof)
+
+
+def _fdr_adjust(p: np.ndarray) -> np.ndarray:
+    """Benjamini-Hochberg q-values, since many pairs are tested at once"""
+    if p.size == 0:
+        return p
+    
+    order = np.argsort(p)
+    ranked = p[order] * p.size / np.arange(1, p.size + 1)
+    q = np.minimum.accumulate(ranked[::-1])[::-1]
+    
+    adjusted = np.empty_like(p)
+    adjusted[order] = np.minimum(q, 1.0)
+    return adjusted
+
+
+class CorrelationService:
+    """Deterministic correlations between health log fields"""
+    
+    @staticmethod
+    def compute(logs: List[HealthLog], max_lag: int = 1) -> Dict:
+        """Same-day and lagged Pearson/Spearman correlations with FDR-adjusted significance"""
+        df = TrendService.logs_to_frame(logs)
+        
+        if df.empty:
+            return {"days_analyzed": 0, "pairs": []}
+        
+        # One row per calendar day so a lag of k rows is a lag of k days; drop fields never logged
+        daily = df[CORRELATION_FIELDS].astype(float).asfreq("D").dropna(axis=1, how="all")
+        fields = list(daily.columns)
+        values = daily.to_numpy()
+        field_count = len(fields)
+        
+        candidates = []
+        for lag in range(max_lag + 1):
+            if lag >= len(daily):
+                break
+            
+            if lag == 0:
+                left, right = values, values
+                # Symmetric: each unordered pair once
+                rows, cols = np.triu_indices(field_count, k=1)
+            else:
+                # Field a on day t against field b on day t + lag
+                left, right = values[:-lag], values[lag:]
+                rows, cols = np.nonzero(~np.eye(field_count, dtype=bool))
+            
+            pearson, n = _pairwise_pearson(left, right)
+            
+            pearson, n = pearson[rows, cols], n[rows, cols]
+            valid = (n >= settings.CORRELATION_MIN_SAMPLES) & ~np.isnan(pearson)
+            rows, cols = rows[valid], cols[valid]
+            spearman = _pairwise_spearman(left, right, rows, cols)
+            
+            candidates.append((lag, rows, cols, pearson[valid], spearman, n[valid]))
+        
+        lags = np.concatenate([np.full(len(c[1]), c[0]) for c in candidates])
+        rows = np.concatenate([c[1] for c in candidates])
+        cols = np.concatenate([c[2] for c in candidates])
+        pearson = np.concatenate([c[3] for c in candidates])
+        spearman = np.concatenate([c[4] for c in candidates])
+        n = np.concatenate([c[5] for c in candidates])
+        
+        p = _p_values(pearson, n)
+        spearman_p = _p_values(np.nan_to_num(spearman), n)
+        q = _fdr_adjust(p)
+        
+        pairs = [
+            {
+                "field_a": fields[rows[i]],
+                "field_b": fields[cols[i]],
+                "lag_days": int(lags[i]),
+                "pearson": round(float(pearson[i]), 3),
+                "spearman": None if np.isnan(spearman[i]) else round(float(spearman[i]), 3),
+                "p_value": float(f"{p[i]:.3g}"),
+                "spearman_p_value": float(f"{spearman_p[i]:.3g}"),
+                "q_value": float(f"{q[i]:.3g}"),
+                "samples": int(n[i]),
+                "significant": bool(q[i] < settings.CORRELATION_SIGNIFICANCE)
+            }
+            for i in np.argsort(-np.abs(pearson))
+        ]
+        
+        return {
+            "days_analyzed": int(len(df)),
+            "period_start": df.index[0].strftime("%Y-%m-%d"),
+            "period_end": df.index[-1].strftime("%Y-%m-%d"),
+            "max_lag_days": max_lag,
+            "min_samples": settings.CORRELATION_MIN_SAMPLES,
+            "significance_level": settings.CORRELATION_SIGNIFICANCE,
+            "pairs_tested": len(pairs),
+            "pairs": pairs
+        }
+    
+    
+    @staticmethod
+    async def get_for_user(user_id: str, days: int = 90, max_lag: int = 1) -> Dict:
+        """Correlations over the user's last days of logs, cached until their logs change"""
+        cached = correlation_cache.get(user_id) or {}
+        
+        result = cached.get((days, max_lag))
+        if result is None:
+            since = datetime.utcnow() - timedelta(days=days)
+            logs = await HealthLog.find(
+                HealthLog.user_id == user_id,
+                HealthLog.log_date >= since
+            ).to_list()
+            
+            result = CorrelationService.compute(logs, max_lag)
+            cached[(days, max_lag)] = result
+            correlation_cache.set(user_id, cached)
+        
+        return result
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import time
+from bson import ObjectId
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.config import settings
+from app.models.healthlog_model import HealthLog
+from app.models.report_model import HealthReport, ENCRYPTED_FIELDS as REPORT_ENCRYPTED_FIELDS
+from app.utils.encryption_utils import reveal
+
+LOG_EXPORT_FIELDS = [
+    "log_date", "temperature", "blood_pressure_systolic", "blood_pressure_diastolic", "heart_rate",
+    "oxygen_saturation", "weight", "blood_sugar", "has_fever", "has_cough", "has_headache",
+    "has_fatigue", "has_body_pain", "has_nausea", "pain_level", "symptom_severity", "mood",
+    "stress_level", "anxiety_level", "sleep_hours", "sleep_quality", "water_intake",
+    "exercise_minutes", "medications_taken", "notes", "symptoms_description",
+    "patient_name", "doctor_name", "created_at", "updated_at"
+]
+
+# Report metadata only; files are downloaded separately
+REPORT_EXPORT_FIELDS = [
+    "report_type", "title", "description", "report_date", "file_name", "file_type", "file_size",
+    "doctor_name", "hospital_name", "diagnosis", "medications", "created_at"
+]
+
+
+def _plain(value, encrypted: bool = False):
+    """Convert BSON values to JSON/CSV-friendly ones, decrypting encrypted fields"""
+    if encrypted:
+        return [reveal(item) for item in value] if isinstance(value, list) else reveal(value)
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class ExportService:
+    """Constant-memory streaming exports of a user's records"""
+    
+    @staticmethod
+    async def _rows(
+        document_class,
+        fields: List[str],
+        query: Dict,
+        sort_field: str,
+        encrypted_fields: List[str] = ()
+    ) -> AsyncIterator[Dict]:
+        """Iterate raw documents with a bounded cursor batch size"""
+        cursor = document_class.get_motor_collection().find(
+            query,
+            projection={field: 1 for field in fields},
+            batch_size=settings.EXPORT_BATCH_SIZE
+        ).sort(sort_field, 1)
+        
+        try:
+            async for document in cursor:
+                yield {"id": str(document["_id"]), **{field: _plain(document.get(field), field in encrypted_fields) for field in fields}}
+        finally:
+            await cursor.close()
+    
+    
+    @staticmethod
+    def _log_query(user_id: str, start_date: Optional[datetime], end_date: Optional[datetime]) -> Dict:
+        query = {"user_id": user_id}
+        if start_date or end_date:
+            query["log_date"] = {}
+            if start_date:
+                query["log_date"]["$gte"] = start_date
+            if end_date:
+                query["log_date"]["$lte"] = end_date
+        return query
+    
+    
+    @staticmethod
+    async def stream_ndjson(
+        user_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        include_reports: bool = False
+    ) -> AsyncIterator[str]:
+        """One JSON object per line, tagged with its record type"""
+        sources = [("log", HealthLog, LOG_EXPORT_FIELDS, ExportService._log_query(user_id, start_date, end_date), "log_date", ())]
+        if include_reports:
+            sources.append(("report", HealthReport, REPORT_EXPORT_FIELDS, {"user_id": user_id}, "report_date", REPORT_ENCRYPTED_FIELDS))
+        
+        started = time.perf_counter()
+        rows = 0
+        buffer = []
+        
+        for record_type, document_class, fields, query, sort_field, encrypted_fields in sources:
+            async for row in ExportService._rows(document_class, fields, query, sort_field, encrypted_fields):
+                buffer.append(json.dumps({"type": record_type, **row}, default=str))
+                rows += 1
+                
+                if len(buffer) >= settings.EXPORT_BATCH_SIZE:
+                    yield "\n".join(buffer) + "\n"
+                    buffer = []
+        
+        if buffer:
+            yield "\n".join(buffer) + "\n"
+        
+        ExportService._log_throughput("ndjson", user_id, rows, started)
+    
+    
+    @staticmethod
+    async def stream_csv(
+        user_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> AsyncIterator[str]:
+        """Health logs as CSV with a header row (list fields joined with '; ')"""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["id"] + LOG_EXPORT_FIELDS)
+        
+        started = time.perf_counter()
+        rows = 0
+        query = ExportService._log_query(user_id, start_date, end_date)
+        
+        async for row in ExportService._rows(HealthLog, LOG_EXPORT_FIELDS, query, "log_date"):
+            writer.writerow([
+                "; ".join(value) if isinstance(value, list) else value
+                for value in row.values()
+            ])
+            rows += 1
+            
+            if rows % settings.EXPORT_BATCH_SIZE == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+        
+        yield output.getvalue()
+        
+        ExportService._log_throughput("csv", user_id, rows, started)
+    
+    
+    @staticmethod
+    def _log_throughput(export_format: str, user_id: str, rows: int, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        rate = rows / elapsed if elapsed else 0
+        print(f"Export ({export_format}) for user {user_id}: {rows} rows in {elapsed:.2f}s ({rate:.0f} rows/sec)")
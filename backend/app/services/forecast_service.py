@@ -0,0 +1,273 @@
+import math
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.models.forecast_model import ForecastModel
+from app.models.healthlog_model import HealthLog
+from app.utils.cache_utils import TTLCache
+from app.utils.resilience_utils import SingleFlight
+
+# Forecast field -> typical day-to-day spread, the floor for the residual error
+FORECAST_FIELDS = {
+    "weight": 2.0,
+    "blood_pressure_systolic": 10.0,
+    "blood_pressure_diastolic": 8.0,
+    "blood_sugar": 20.0
+}
+
+# Predictions outside the range accepted for logged values are never served
+FORECAST_RANGES = {
+    "weight": (10, 300),
+    "blood_pressure_systolic": (50, 250),
+    "blood_pressure_diastolic": (30, 150),
+    "blood_sugar": (0, 600)
+}
+
+# Logs stamped this long before a training pass may still be committing; they are
+# re-read on the next pass and skipped by id if already trained
+TRAINING_WATERMARK_LAG = timedelta(minutes=1)
+
+# Per-field sufficient statistics of an ordinary least-squares fit of value on days since origin
+STAT_KEYS = ["n", "sum_t", "sum_tt", "sum_y", "sum_ty", "sum_yy"]
+
+# user_id -> model state; LRU in front of the forecast_models collection
+forecast_cache = TTLCache(
+    maxsize=settings.FORECAST_CACHE_MAX_SIZE,
+    ttl=settings.FORECAST_CACHE_TTL_SECONDS
+)
+forecast_singleflight = SingleFlight()
+_stale_users = set()
+
+
+def mark_forecast_stale(user_id: str) -> None:
+    """Flag a user's models for an incremental update on the next forecast"""
+    _stale_users.add(user_id)
+
+
+class ForecastService:
+    """Incrementally trained per-user trend models for vitals"""
+    
+    @staticmethod
+    def _days(state: Dict, date: datetime) -> float:
+        return (date - state["origin"]).total_seconds() / 86400
+    
+    
+    @staticmethod
+    def _train(state: Dict, logs: List[HealthLog]) -> None:
+        """Add new logs to each field's running sums (exact, order-independent least squares)"""
+        for field in FORECAST_FIELDS:
+            stats = state["stats"].get(field)
+            
+            for log in logs:
+                value = getattr(log, field)
+                if value is None:
+                    continue
+                
+                if stats is None:
+                    stats = {key: 0.0 for key in STAT_KEYS}
+                    stats.update({"last_value": None, "last_date": None})
+                    state["stats"][field] = stats
+                
+                t, y = ForecastService._days(state, log.log_date), float(value)
+                stats["n"] += 1
+                stats["sum_t"] += t
+                stats["sum_tt"] += t * t
+                stats["sum_y"] += y
+                stats["sum_ty"] += t * y
+                stats["sum_yy"] += y * y
+                
+                if stats["last_date"] is None or log.log_date >= stats["last_date"]:
+                    stats["last_date"], stats["last_value"] = log.log_date, value
+    
+    
+    @staticmethod
+    def _fit(stats: Dict, min_spread: float) -> Tuple[float, float, float, float, float]:
+        """Least-squares line from the sums: (intercept, slope, residual std, mean t, Sxx)"""
+        n = stats["n"]
+        mean_t, mean_y = stats["sum_t"] / n, stats["sum_y"] / n
+        sxx = stats["sum_tt"] - stats["sum_t"] * mean_t
+        sxy = stats["sum_ty"] - stats["sum_t"] * mean_y
+        syy = stats["sum_yy"] - stats["sum_y"] * mean_y
+        
+        # All values logged on one day leave the slope undetermined; forecast the mean
+        slope = sxy / sxx if sxx > 1e-9 else 0.0
+        intercept = mean_y - slope * mean_t
+        
+        residual = max(syy - slope * sxy, 0.0)
+        std = math.sqrt(residual / (n - 2)) if n > 2 else min_spread
+        
+        return intercept, slope, max(std, min_spread), mean_t, sxx
+    
+    
+    @staticmethod
+    def _state_from_record(record: Optional[ForecastModel]) -> Optional[Dict]:
+        if record is None:
+            return None
+        
+        # Reset records, and records written before the switch to sufficient statistics, retrain from scratch
+        if record.origin is None:
+            return ForecastService._empty_state(record.generation)
+        
+        return {
+            "origin": record.origin,
+            "trained_until": record.trained_until,
+            "trained_ids": record.trained_ids,
+            "generation": record.generation,
+            "stats": record.stats
+        }
+    
+    
+    @staticmethod
+    def _empty_state(generation: int = 0) -> Dict:
+        return {"origin": None, "trained_until": None, "trained_ids": [], "generation": generation, "stats": {}}
+    
+    
+    @staticmethod
+    async def _refresh(user_id: str) -> Optional[Dict]:
+        """Load the user's models and train them on logs created since the last update"""
+        _stale_users.discard(user_id)
+        
+        state = forecast_cache.get(user_id)
+        if state is None:
+            record = await ForecastModel.find_one(ForecastModel.user_id == user_id)
+            state = ForecastService._state_from_record(record)
+        
+        read_at = datetime.utcnow()
+        query = [HealthLog.user_id == user_id]
+        if state is not None and state["trained_until"] is not None:
+            # >= plus id dedup: logs sharing the watermark's timestamp (e.g. one bulk request) are not skipped
+            query.append(HealthLog.created_at >= state["trained_until"])
+        
+        logs = await HealthLog.find(*query).sort("+created_at").to_list()
+        trained_ids = set(state["trained_ids"]) if state is not None else set()
+        new_logs = [log for log in logs if str(log.id) not in trained_ids]
+        
+        if new_logs:
+            if state is None:
+                state = ForecastService._empty_state()
+            if state["origin"] is None:
+                state["origin"] = min(log.log_date for log in new_logs)
+            
+            ForecastService._train(state, new_logs)
+            
+            # Stay behind logs whose inserts may still be in flight; Mongo stores milliseconds
+            watermark = min(logs[-1].created_at, read_at - TRAINING_WATERMARK_LAG)
+            watermark = watermark.replace(microsecond=watermark.microsecond // 1000 * 1000)
+            if state["trained_until"] is None or watermark > state["trained_until"]:
+                state["trained_until"] = watermark
+            state["trained_ids"] = [str(log.id) for log in logs if log.created_at >= state["trained_until"]]
+            
+            try:
+                # Matching the generation keeps a reset by an edit or delete from being overwritten
+                await ForecastModel.get_motor_collection().update_one(
+                    {"user_id": user_id, "generation": state["generation"]},
+                    {
+                        "$set": {
+                            "origin": state["origin"],
+                            "trained_until": state["trained_until"],
+                            "trained_ids": state["trained_ids"],
+                            "stats": state["stats"],
+                            "updated_at": datetime.utcnow()
+                        },
+                        "$unset": {"model_blob": "", "samples": ""}
+                    },
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                # The models were reset since this state was loaded: retrain from the stored record
+                forecast_cache.invalidate(user_id)
+                return await ForecastService._refresh(user_id)
+        
+        if state is not None:
+            forecast_cache.set(user_id, state)
+        
+        return state
+    
+    
+    @staticmethod
+    async def reset(user_id: str) -> None:
+        """Discard a user's models so the next forecast retrains on all logs (after an edit or delete)"""
+        # Sums can't safely drop a row: it may not have been trained yet, and last_value isn't invertible
+        forecast_cache.invalidate(user_id)
+        _stale_users.discard(user_id)
+        
+        await ForecastModel.get_motor_collection().update_one(
+            {"user_id": user_id},
+            {
+                "$set": {
+                    "origin": None,
+                    "trained_until": None,
+                    "trained_ids": [],
+                    "stats": {},
+                    "updated_at": datetime.utcnow()
+                },
+                "$inc": {"generation": 1}
+            }
+        )
+    
+    
+    @staticmethod
+    async def forecast(user_id: str, horizon_days: int = 14) -> Dict:
+        """Daily predictions with ~95% bands for each field that has enough history"""
+        started = time.perf_counter()
+        
+        state = forecast_cache.get(user_id)
+        warm = state is not None and user_id not in _stale_users
+        if not warm:
+            state = await forecast_singleflight.do(user_id, lambda: ForecastService._refresh(user_id))
+        
+        forecasts = {}
+        withheld = {}
+        if state is not None:
+            today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            dates = [today + timedelta(days=i) for i in range(1, horizon_days + 1)]
+            
+            for field, stats in state["stats"].items():
+                if stats["n"] < settings.FORECAST_MIN_SAMPLES:
+                    continue
+                
+                intercept, slope, std, mean_t, sxx = ForecastService._fit(stats, FORECAST_FIELDS[field])
+                low, high = FORECAST_RANGES[field]
+                
+                points = []
+                for date in dates:
+                    t = ForecastService._days(state, date)
+                    value = intercept + slope * t
+                    # Prediction interval widens with distance from the logged data
+                    spread = std * math.sqrt(1 + 1 / stats["n"] + ((t - mean_t) ** 2 / sxx if sxx > 1e-9 else 0))
+                    points.append((date, value, spread))
+                
+                if not all(math.isfinite(value) and math.isfinite(spread) for _, value, spread in points):
+                    withheld[field] = "model produced a non-finite prediction"
+                    continue
+                
+                if not all(low <= value <= high for _, value, _ in points):
+                    withheld[field] = f"trend leaves the plausible range ({low}-{high}) within {horizon_days} days"
+                    continue
+                
+                forecasts[field] = {
+                    "last_value": stats["last_value"],
+                    "last_logged": stats["last_date"],
+                    "trend_per_week": round(slope * 7, 2),
+                    "samples": int(stats["n"]),
+                    "points": [
+                        {
+                            "date": date.strftime("%Y-%m-%d"),
+                            "value": round(value, 1),
+                            "lower": round(max(value - 1.96 * spread, low), 1),
+                            "upper": round(min(value + 1.96 * spread, high), 1)
+                        }
+                        for date, value, spread in points
+                    ]
+                }
+        
+        return {
+            "horizon_days": horizon_days,
+            "forecasts": forecasts,
+            "withheld": withheld,
+            "cached": warm,
+            "generated_in_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
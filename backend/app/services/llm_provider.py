@@ -0,0 +1,56 @@
+from openai import AsyncOpenAI
+from typing import Callable, Dict, Tuple
+
+from app.config import settings
+from app.utils.resilience_utils import CircuitBreaker
+
+# Provider name -> client factory. Any OpenAI-compatible backend can be registered.
+PROVIDERS: Dict[str, Callable[[], AsyncOpenAI]] = {
+    # Retries and deadlines are handled in AIService._complete
+    "openai": lambda: AsyncOpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0),
+    "local": lambda: AsyncOpenAI(api_key="local", base_url=settings.LOCAL_LLM_BASE_URL, max_retries=0)
+}
+
+_clients: Dict[str, AsyncOpenAI] = {}
+breakers: Dict[str, CircuitBreaker] = {}
+
+
+def register_provider(name: str, factory: Callable[[], AsyncOpenAI]) -> None:
+    """Add or replace an LLM provider"""
+    PROVIDERS[name] = factory
+    _clients.pop(name, None)
+
+
+def resolve_route(route: str) -> Tuple[str, str]:
+    """Get (provider, model) for a route from AI_ROUTE_MODELS ("model" or "provider:model")"""
+    spec = settings.AI_ROUTE_MODELS.get(route) or settings.AI_ROUTE_MODELS["default"]
+    
+    if ":" in spec:
+        provider, model = spec.split(":", 1)
+    else:
+        provider, model = settings.LLM_PROVIDER, spec
+    
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{provider}' for route '{route}'")
+    
+    return provider, model
+
+
+def get_client(provider: str) -> AsyncOpenAI:
+    """Get the shared client for a provider"""
+    if provider not in _clients:
+        _clients[provider] = PROVIDERS[provider]()
+    
+    return _clients[provider]
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Get the circuit breaker guarding a provider"""
+    if provider not in breakers:
+        breakers[provider] = CircuitBreaker(
+            f"AI provider '{provider}'",
+            failure_threshold=settings.AI_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.AI_BREAKER_RESET_SECONDS
+        )
+    
+    return breakers[provider]
@@ -0,0 +1,69 @@
+from datetime import datetime
+from typing import Dict, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.models.user_model import User
+from app.utils.role_utils import invalidate_cached_user
+from app.utils.task_utils import PeriodicTask
+
+
+class LoginTrackerService:
+    """Write-behind buffer for users' last_login timestamps"""
+    
+    _pending: Dict[str, datetime] = {}
+    _flusher = PeriodicTask(
+        "last_login flush",
+        settings.LAST_LOGIN_FLUSH_SECONDS,
+        lambda: LoginTrackerService.flush(),
+        run_on_stop=True
+    )
+    
+    @staticmethod
+    def record_login(user_id: str, login_time: Optional[datetime] = None) -> None:
+        """Queue a last_login update; only the latest time per user is kept"""
+        login_time = login_time or datetime.utcnow()
+        previous = LoginTrackerService._pending.get(user_id)
+        
+        if previous is None or login_time > previous:
+            LoginTrackerService._pending[user_id] = login_time
+    
+    @staticmethod
+    async def flush() -> int:
+        """Write all buffered timestamps in one unordered bulk_write"""
+        if not LoginTrackerService._pending:
+            return 0
+        
+        pending = LoginTrackerService._pending
+        LoginTrackerService._pending = {}
+        
+        # $max keeps a late flush from moving last_login backwards
+        operations = [
+            UpdateOne({"_id": ObjectId(user_id)}, {"$max": {"last_login": login_time}})
+            for user_id, login_time in pending.items()
+        ]
+        
+        try:
+            await User.get_motor_collection().bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"Warning: Failed to flush last_login updates: {e}")
+            # Re-queue so the next interval retries
+            for user_id, login_time in pending.items():
+                LoginTrackerService.record_login(user_id, login_time)
+            return 0
+        
+        for user_id in pending:
+            invalidate_cached_user(user_id)
+        
+        return len(operations)
+    
+    @staticmethod
+    def start():
+        """Start the periodic flush task"""
+        LoginTrackerService._flusher.start()
+    
+    @staticmethod
+    async def stop():
+        """Stop the periodic flush task and write anything still buffered"""
+        await LoginTrackerService._flusher.stop()
@@ -0,0 +1,277 @@
+import asyncio
+import multiprocessing
+import os
+import time
+import numpy as np
+from bson import ObjectId
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from typing import List, Dict, Optional, Tuple
+
+from app.config import settings
+from app.models.healthlog_model import HealthLog
+from app.models.user_model import User, UserRole
+from app.services.trend_service import TrendService, SYMPTOM_FIELDS
+from app.utils.role_utils import invalidate_cached_user
+from app.utils.task_utils import PeriodicTask
+
+# Points added per alert, scaled by the share of the patient's recent days that breach it
+RISK_WEIGHTS = {
+    "low_oxygen": 30,
+    "high_blood_pressure": 25,
+    "fever": 20,
+    "high_blood_sugar": 15,
+    "high_heart_rate": 10,
+    "short_sleep": 5,
+    "high_stress": 5
+}
+SYMPTOM_WEIGHT = 15  # Scaled by the average share of symptom flags set per day
+SEVERE_PAIN_WEIGHT = 10
+NO_RECENT_LOGS_SCORE = 5.0  # Missing data is worth a look, but below any real alert
+
+PAIN_LEVELS = {"none": 0, "mild": 1, "moderate": 2, "severe": 3, "critical": 4}
+RISK_COLUMNS = [
+    "temperature", "blood_pressure_systolic", "blood_pressure_diastolic", "heart_rate",
+    "oxygen_saturation", "blood_sugar", "sleep_hours", "stress_level", "pain_level"
+] + SYMPTOM_FIELDS
+
+_risk_executor: Optional[ProcessPoolExecutor] = None
+
+
+def score_batch(
+    patient_ids: List[str],
+    patient_index: np.ndarray,
+    day_index: np.ndarray,
+    columns: Dict[str, np.ndarray]
+) -> List[Tuple[str, float, List[str]]]:
+    """Score a batch of patients at once (runs in a worker process).
+    
+    Rows from all patients are evaluated together. Rows are first bucketed into
+    (patient, calendar day) pairs, a day breaching a rule if any log that day does,
+    then np.bincount turns day-level breaches into per-patient shares of days.
+    """
+    patient_count = len(patient_ids)
+    
+    pairs, row_day = np.unique(np.stack([patient_index, day_index]), axis=1, return_inverse=True)
+    row_day = row_day.reshape(-1)
+    day_patient = pairs[0]
+    day_count = pairs.shape[1]
+    
+    def per_day(values: np.ndarray) -> np.ndarray:
+        # 1.0 for each (patient, day) with at least one row set
+        return (np.bincount(row_day, weights=values, minlength=day_count) > 0).astype(float)
+    
+    days = np.bincount(day_patient, minlength=patient_count).astype(float)
+    logged = days > 0
+    shares = {}
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for name, weight in RISK_WEIGHTS.items():
+            breaches = np.asarray(TrendService.ALERT_RULES[name][1](columns), dtype=float)
+            shares[name] = np.bincount(day_patient, weights=per_day(breaches), minlength=patient_count) / days
+        
+        symptom_share = sum(per_day(columns[field]) for field in SYMPTOM_FIELDS) / len(SYMPTOM_FIELDS)
+        shares["symptoms"] = np.bincount(day_patient, weights=symptom_share, minlength=patient_count) / days
+        
+        severe_pain = per_day((columns["pain_level"] >= PAIN_LEVELS["severe"]).astype(float))
+        shares["severe_pain"] = np.bincount(day_patient, weights=severe_pain, minlength=patient_count) / days
+    
+    scores = sum(shares[name] * weight for name, weight in RISK_WEIGHTS.items())
+    scores = scores + shares["symptoms"] * SYMPTOM_WEIGHT + shares["severe_pain"] * SEVERE_PAIN_WEIGHT
+    scores = np.where(logged, np.clip(scores, 0, 100), NO_RECENT_LOGS_SCORE)
+    
+    results = []
+    for i, patient_id in enumerate(patient_ids):
+        if not logged[i]:
+            results.append((patient_id, NO_RECENT_LOGS_SCORE, ["no_recent_logs"]))
+            continue
+        
+        flags = sorted(
+            (name for name in list(RISK_WEIGHTS) + ["severe_pain"] if shares[name][i] > 0),
+            key=lambda name: -shares[name][i]
+        )
+        results.append((patient_id, round(float(scores[i]), 1), flags))
+    
+    return results
+
+
+def _columnar(patient_ids: List[str], rows: List[Dict]) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """Turn raw log documents into compact arrays (cheap to send to a worker)"""
+    position = {patient_id: i for i, patient_id in enumerate(patient_ids)}
+    patient_index = np.array([position[row["user_id"]] for row in rows], dtype=np.int64)
+    # Calendar day (UTC) of each log, as days since the epoch
+    day_index = np.array([row["log_date"] for row in rows], dtype="datetime64[ms]").astype("datetime64[D]").astype(np.int64)
+    
+    columns = {
+        field: np.array([row.get(field) for row in rows], dtype=float)
+        for field in RISK_COLUMNS if field != "pain_level" and field not in SYMPTOM_FIELDS
+    }
+    for field in SYMPTOM_FIELDS:
+        columns[field] = np.array([bool(row.get(field)) for row in rows], dtype=float)
+    columns["pain_level"] = np.array([PAIN_LEVELS.get(row.get("pain_level"), 0) for row in rows], dtype=float)
+    
+    return patient_index, day_index, columns
+
+
+def get_risk_executor() -> ProcessPoolExecutor:
+    """Get the scoring process pool, started on first use"""
+    global _risk_executor
+    
+    if _risk_executor is None:
+        # spawn: workers must not inherit the parent's Mongo client and event loop
+        _risk_executor = ProcessPoolExecutor(
+            max_workers=settings.RISK_WORKERS or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    
+    return _risk_executor
+
+
+def shutdown_risk_executor() -> None:
+    """Stop the scoring process pool"""
+    global _risk_executor
+    
+    if _risk_executor is not None:
+        _risk_executor.shutdown(wait=False, cancel_futures=True)
+        _risk_executor = None
+
+
+class RiskService:
+    """Batch risk scoring of patients from their recent health logs"""
+    
+    _scheduler = PeriodicTask(
+        "Scheduled risk scoring",
+        settings.RISK_SCORING_INTERVAL_HOURS * 3600,
+        lambda: RiskService._scheduled_run()
+    )
+    
+    @staticmethod
+    async def _load_batch(patient_ids: List[str], since: datetime) -> List[Dict]:
+        """Fetch only the fields scoring needs for a batch of patients"""
+        cursor = HealthLog.get_motor_collection().find(
+            {"user_id": {"$in": patient_ids}, "log_date": {"$gte": since}},
+            projection={field: 1 for field in RISK_COLUMNS + ["user_id", "log_date"]},
+            batch_size=settings.RISK_CURSOR_BATCH_SIZE
+        )
+        
+        return await cursor.to_list(length=None)
+    
+    
+    @staticmethod
+    async def score_patients(doctor_id: Optional[str] = None) -> Dict:
+        """Score every patient (or one doctor's panel) and write the scores back"""
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        executor = get_risk_executor()
+        since = datetime.utcnow() - timedelta(days=settings.RISK_WINDOW_DAYS)
+        
+        query = {"role": UserRole.PATIENT.value}
+        if doctor_id:
+            query["assigned_doctor_id"] = doctor_id
+        
+        patient_cursor = User.get_motor_collection().find(query, projection={"_id": 1})
+        
+        # Keep a bounded number of batches in flight so memory stays flat on large panels
+        in_flight = set()
+        max_in_flight = 2 * (settings.RISK_WORKERS or os.cpu_count())
+        scored = 0
+        failures = []
+        
+        def record_failure(patient_ids: List[str], stage: str, error: Exception) -> int:
+            # One bad batch is reported and skipped; the rest of the run carries on
+            print(f"Warning: Risk scoring batch of {len(patient_ids)} patients failed at {stage}: {error}")
+            failures.append({"patients": len(patient_ids), "stage": stage, "error": str(error)})
+            return 0
+        
+        async def write_scores(patient_ids: List[str], future) -> int:
+            try:
+                results = await future
+            except Exception as e:
+                return record_failure(patient_ids, "scoring", e)
+            
+            scored_at = datetime.utcnow()
+            try:
+                await User.get_motor_collection().bulk_write([
+                    UpdateOne(
+                        {"_id": ObjectId(patient_id)},
+                        {"$set": {"risk_score": score, "risk_flags": flags, "risk_scored_at": scored_at}}
+                    )
+                    for patient_id, score, flags in results
+                ], ordered=False)
+            except Exception as e:
+                return record_failure(patient_ids, "write", e)
+            finally:
+                # Even a partial unordered write may have changed some users
+                for patient_id, _, _ in results:
+                    invalidate_cached_user(patient_id)
+            
+            return len(results)
+        
+        async def submit(patient_ids: List[str]):
+            nonlocal scored
+            try:
+                rows = await RiskService._load_batch(patient_ids, since)
+                patient_index, day_index, columns = _columnar(patient_ids, rows)
+                future = loop.run_in_executor(executor, score_batch, patient_ids, patient_index, day_index, columns)
+            except Exception as e:
+                record_failure(patient_ids, "load", e)
+                return
+            
+            in_flight.add(asyncio.ensure_future(write_scores(patient_ids, future)))
+            
+            if len(in_flight) >= max_in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    in_flight.discard(task)
+                    scored += task.result()
+        
+        try:
+            batch = []
+            async for patient in patient_cursor:
+                batch.append(str(patient["_id"]))
+                if len(batch) >= settings.RISK_BATCH_SIZE:
+                    await submit(batch)
+                    batch = []
+            
+            if batch:
+                await submit(batch)
+        finally:
+            # Never leave batches running unobserved, even if the patient cursor fails
+            for task in asyncio.as_completed(in_flight):
+                scored += await task
+        
+        elapsed = time.perf_counter() - started
+        return {
+            "patients_scored": scored,
+            "patients_failed": sum(failure["patients"] for failure in failures),
+            "failed_batches": failures,
+            "elapsed_seconds": round(elapsed, 2),
+            "patients_per_second": round(scored / elapsed, 1) if elapsed else None,
+            "workers": settings.RISK_WORKERS or os.cpu_count(),
+            "window_days": settings.RISK_WINDOW_DAYS
+        }
+    
+    
+    @staticmethod
+    async def _scheduled_run():
+        stats = await RiskService.score_patients()
+        print(
+            f"Risk scoring: {stats['patients_scored']} patients at {stats['patients_per_second']}/s, "
+            f"{stats['patients_failed']} failed"
+        )
+    
+    
+    @staticmethod
+    def start():
+        """Start periodic scoring (disabled when RISK_SCORING_INTERVAL_HOURS is 0)"""
+        if settings.RISK_SCORING_INTERVAL_HOURS > 0:
+            RiskService._scheduler.start()
+    
+    
+    @staticmethod
+    async def stop():
+        """Stop periodic scoring (letting a run in progress finish) and the worker pool"""
+        await RiskService._scheduler.stop()
+        
+        shutdown_risk_executor()
@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple, List
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.models.telemetry_model import LLMUsage
+from app.utils.task_utils import PeriodicTask
+
+# (period_start, route, model, user_id)
+BucketKey = Tuple[datetime, str, str, Optional[str]]
+
+COUNTER_FIELDS = [
+    "calls", "errors", "aborted", "retries", "prompt_tokens", "completion_tokens",
+    "cost_usd", "latency_ms_total", "ttft_ms_total", "ttft_count"
+]
+
+
+class LLMTelemetryService:
+    """In-memory LLM call aggregates, flushed periodically to llm_usage"""
+    
+    _buckets: Dict[BucketKey, Dict] = {}
+    _flusher = PeriodicTask(
+        "LLM telemetry flush",
+        settings.AI_TELEMETRY_FLUSH_SECONDS,
+        lambda: LLMTelemetryService.flush(),
+        run_on_stop=True
+    )
+    
+    @staticmethod
+    def _cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """Estimated cost from AI_MODEL_PRICES (USD per 1M prompt / completion tokens)"""
+        prices = settings.AI_MODEL_PRICES.get(model)
+        if not prices:
+            # Dated snapshots ("gpt-4o-mini-2024-07-18") are priced like their base model
+            prices = next((p for name, p in settings.AI_MODEL_PRICES.items() if model.startswith(name)), None)
+        if not prices:
+            return 0.0
+        
+        return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+    
+    @staticmethod
+    def record(
+        route: str,
+        model: str,
+        user_id: Optional[str] = None,
+        usage=None,
+        latency: float = 0.0,
+        time_to_first_token: Optional[float] = None,
+        retries: int = 0,
+        error: Optional[BaseException] = None,
+        aborted: bool = False
+    ) -> None:
+        """Add one completion call to the current hour's aggregate (latencies in seconds)"""
+        period_start = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        key = (period_start, route, model, user_id)
+        
+        bucket = LLMTelemetryService._buckets.get(key)
+        if bucket is None:
+            bucket = {field: 0 for field in COUNTER_FIELDS}
+            bucket["latency_ms_max"] = 0.0
+            bucket["error_classes"] = {}
+            LLMTelemetryService._buckets[key] = bucket
+        
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        latency_ms = latency * 1000
+        
+        bucket["calls"] += 1
+        bucket["retries"] += retries
+        bucket["prompt_tokens"] += prompt_tokens
+        bucket["completion_tokens"] += completion_tokens
+        bucket["cost_usd"] += LLMTelemetryService._cost(model, prompt_tokens, completion_tokens)
+        bucket["latency_ms_total"] += latency_ms
+        bucket["latency_ms_max"] = max(bucket["latency_ms_max"], latency_ms)
+        
+        if time_to_first_token is not None:
+            bucket["ttft_ms_total"] += time_to_first_token * 1000
+            bucket["ttft_count"] += 1
+        
+        if aborted:
+            # The caller went away (e.g. client disconnect); not a provider error
+            bucket["aborted"] += 1
+        elif error is not None:
+            error_class = type(error).__name__
+            bucket["errors"] += 1
+            bucket["error_classes"][error_class] = bucket["error_classes"].get(error_class, 0) + 1
+    
+    @staticmethod
+    async def flush() -> int:
+        """Merge buffered aggregates into Mongo with one unordered bulk_write"""
+        if not LLMTelemetryService._buckets:
+            return 0
+        
+        buckets = LLMTelemetryService._buckets
+        LLMTelemetryService._buckets = {}
+        
+        operations = []
+        for (period_start, route, model, user_id), bucket in buckets.items():
+            increments = {field: bucket[field] for field in COUNTER_FIELDS}
+            increments.update({f"error_classes.{name}": count for name, count in bucket["error_classes"].items()})
+            
+            operations.append(UpdateOne(
+                {"period_start": period_start, "route": route, "model": model, "user_id": user_id},
+                {"$inc": increments, "$max": {"latency_ms_max": bucket["latency_ms_max"]}},
+                upsert=True
+            ))
+        
+        try:
+            await LLMUsage.get_motor_collection().bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"Warning: Failed to flush LLM telemetry: {e}")
+            # Merge back so the next interval retries
+            for key, bucket in buckets.items():
+                LLMTelemetryService._merge(key, bucket)
+            return 0
+        
+        return len(operations)
+    
+    @staticmethod
+    def _merge(key: BucketKey, bucket: Dict) -> None:
+        current = LLMTelemetryService._buckets.get(key)
+        if current is None:
+            LLMTelemetryService._buckets[key] = bucket
+            return
+        
+        for field in COUNTER_FIELDS:
+            current[field] += bucket[field]
+        current["latency_ms_max"] = max(current["latency_ms_max"], bucket["latency_ms_max"])
+        for name, count in bucket["error_classes"].items():
+            current["error_classes"][name] = current["error_classes"].get(name, 0) + count
+    
+    @staticmethod
+    async def rollup(group_by: str, hours: int = 24, limit: int = 50) -> List[Dict]:
+        """Aggregate stored usage over the last hours, grouped by route, model or user_id"""
+        since = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+        
+        pipeline = [
+            {"$match": {"period_start": {"$gte": since}}},
+            {"$group": {
+                "_id": f"${group_by}",
+                **{field: {"$sum": f"${field}"} for field in COUNTER_FIELDS},
+                "latency_ms_max": {"$max": "$latency_ms_max"}
+            }},
+            {"$sort": {"cost_usd": -1, "prompt_tokens": -1}},
+            {"$limit": limit}
+        ]
+        
+        rows = await LLMUsage.aggregate(pipeline).to_list()
+        window_seconds = hours * 3600
+        
+        return [
+            {
+                group_by: row["_id"],
+                "calls": row["calls"],
+                "errors": row["errors"],
+                "error_rate": round(row["errors"] / row["calls"], 4) if row["calls"] else 0,
+                "aborted": row["aborted"],
+                "retries": row["retries"],
+                "prompt_tokens": row["prompt_tokens"],
+                "completion_tokens": row["completion_tokens"],
+                "avg_prompt_tokens": round(row["prompt_tokens"] / row["calls"], 1) if row["calls"] else 0,
+                "cost_usd": round(row["cost_usd"], 4),
+                "avg_latency_ms": round(row["latency_ms_total"] / row["calls"], 1) if row["calls"] else 0,
+                "max_latency_ms": round(row["latency_ms_max"], 1),
+                "avg_time_to_first_token_ms": round(row["ttft_ms_total"] / row["ttft_count"], 1) if row["ttft_count"] else None,
+                # Little's law: average number of calls in flight over the window
+                "avg_concurrency": round(row["latency_ms_total"] / 1000 / window_seconds, 3)
+            }
+            for row in rows
+        ]
+    
+    @staticmethod
+    def start():
+        """Start the periodic flush task"""
+        LLMTelemetryService._flusher.start()
+    
+    @staticmethod
+    async def stop():
+        """Stop the periodic flush task and write anything still buffered"""
+        await LLMTelemetryService._flusher.stop()
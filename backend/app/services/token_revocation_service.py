@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.config import settings
+from app.models.token_model import RevokedToken
+from app.utils.auth_utils import revoke_token, mark_revoked, prune_revoked_tokens
+from app.utils.task_utils import PeriodicTask
+
+# Re-read this much history each sync so revocations still being written are not missed
+SYNC_OVERLAP = timedelta(minutes=1)
+
+
+class TokenRevocationService:
+    """Shares access-token revocations across workers through the revoked_tokens collection"""
+    
+    _synced_at: Optional[datetime] = None
+    _syncer = PeriodicTask(
+        "Token revocation sync",
+        settings.TOKEN_REVOCATION_SYNC_SECONDS,
+        lambda: TokenRevocationService.sync()
+    )
+    
+    @staticmethod
+    async def revoke(token: str) -> None:
+        """Revoke a token here immediately and on other workers within one sync interval"""
+        revoked = revoke_token(token)
+        if revoked is None:
+            return
+        
+        digest, exp = revoked
+        await RevokedToken.get_motor_collection().update_one(
+            {"digest": digest},
+            {
+                "$setOnInsert": {
+                    "expires_at": datetime.utcfromtimestamp(exp),
+                    "created_at": datetime.utcnow()
+                }
+            },
+            upsert=True
+        )
+    
+    @staticmethod
+    async def sync() -> int:
+        """Load revocations made since the last sync (all unexpired ones on the first call)"""
+        started = datetime.utcnow()
+        query = {"expires_at": {"$gt": started}}
+        if TokenRevocationService._synced_at is not None:
+            query["created_at"] = {"$gte": TokenRevocationService._synced_at - SYNC_OVERLAP}
+        
+        loaded = 0
+        async for document in RevokedToken.get_motor_collection().find(query, {"digest": 1, "expires_at": 1}):
+            mark_revoked(document["digest"], document["expires_at"].replace(tzinfo=timezone.utc).timestamp())
+            loaded += 1
+        
+        prune_revoked_tokens()
+        TokenRevocationService._synced_at = started
+        
+        return loaded
+    
+    @staticmethod
+    def start():
+        """Start the periodic sync task"""
+        TokenRevocationService._syncer.start()
+    
+    @staticmethod
+    async def stop():
+        """Stop the periodic sync task"""
+        await TokenRevocationService._syncer.stop()
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Optional
+
+from app.models.healthlog_model import HealthLog
+
+# Numeric HealthLog fields analyzed for trends
+METRIC_FIELDS = [
+    "temperature", "blood_pressure_systolic", "blood_pressure_diastolic", "heart_rate",
+    "oxygen_saturation", "weight", "blood_sugar", "sleep_hours", "sleep_quality",
+    "stress_level", "anxiety_level", "water_intake", "exercise_minutes"
+]
+
+# Boolean symptom flags analyzed for streaks
+SYMPTOM_FIELDS = ["has_fever", "has_cough", "has_headache", "has_fatigue", "has_body_pain", "has_nausea"]
+
+
+def _round(value, digits: int = 2) -> Optional[float]:
+    """Convert numpy scalars to JSON-friendly floats"""
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), digits)
+
+
+class TrendService:
+    """Deterministic trend and alert analysis over health logs"""
+    
+    # Alert rules evaluated per day: name -> (description, predicate over the daily frame)
+    ALERT_RULES = {
+        "high_blood_pressure": (
+            "BP above 140/90",
+            lambda df: (df["blood_pressure_systolic"] >= 140) | (df["blood_pressure_diastolic"] >= 90)
+        ),
+        "fever": ("Temperature at or above 38.0°C", lambda df: df["temperature"] >= 38.0),
+        "low_oxygen": ("SpO2 below 95%", lambda df: df["oxygen_saturation"] < 95),
+        "high_blood_sugar": ("Blood sugar above 180 mg/dL", lambda df: df["blood_sugar"] > 180),
+        "high_heart_rate": ("Resting heart rate above 100 BPM", lambda df: df["heart_rate"] > 100),
+        "short_sleep": ("Less than 6 hours of sleep", lambda df: df["sleep_hours"] < 6),
+        "high_stress": ("Stress level 8/10 or higher", lambda df: df["stress_level"] >= 8)
+    }
+    
+    @staticmethod
+    def logs_to_frame(logs: List[HealthLog]) -> pd.DataFrame:
+        """Build a daily frame (one row per calendar day, oldest first)"""
+        records = [
+            {
+                "date": log.log_date,
+                **{field: getattr(log, field) for field in METRIC_FIELDS},
+                **{field: bool(getattr(log, field)) for field in SYMPTOM_FIELDS}
+            }
+            for log in logs
+        ]
+        
+        df = pd.DataFrame.from_records(records, columns=["date"] + METRIC_FIELDS + SYMPTOM_FIELDS)
+        if df.empty:
+            return df
+        
+        df["date"] = pd.to_datetime(df["date"]).dt.normalize()
+        df[METRIC_FIELDS] = df[METRIC_FIELDS].astype(float)
+        
+        # Several logs on one day: average the vitals, any symptom counts
+        aggregations = {field: "mean" for field in METRIC_FIELDS}
+        aggregations.update({field: "max" for field in SYMPTOM_FIELDS})
+        
+        return df.groupby("date").agg(aggregations).sort_index()
+    
+    
+    @staticmethod
+    def compute_facts(logs: List[HealthLog], window_days: int = 7) -> Dict:
+        """Compute rolling means, slopes, threshold breaches and symptom streaks"""
+        df = TrendService.logs_to_frame(logs)
+        
+        if df.empty:
+            return {"days_analyzed": 0, "metrics": {}, "alerts": [], "symptom_streaks": {}}
+        
+        recent = df.iloc[-window_days:]
+        earlier = df.iloc[-2 * window_days:-window_days]
+        day_offsets = (df.index - df.index[0]).days.to_numpy(dtype=float)
+        rolling = df[METRIC_FIELDS].rolling(window_days, min_periods=1).mean()
+        
+        metrics = {}
+        for field in METRIC_FIELDS:
+            values = df[field].to_numpy()
+            present = ~np.isnan(values)
+            if not present.any():
+                continue
+            
+            slope = None
+            if present.sum() >= 2 and np.ptp(day_offsets[present]) > 0:
+                slope = np.polyfit(day_offsets[present], values[present], 1)[0]
+            
+            recent_mean = recent[field].mean()
+            earlier_mean = earlier[field].mean() if not earlier.empty else np.nan
+            
+            metrics[field] = {
+                "latest": _round(values[present][-1]),
+                "mean": _round(np.nanmean(values)),
+                "rolling_mean": _round(rolling[field].iloc[-1]),
+                "recent_mean": _round(recent_mean),
+                "previous_mean": _round(earlier_mean),
+                "change": _round(recent_mean - earlier_mean),
+                "slope_per_day": _round(slope, 3)
+            }
+        
+        alerts = []
+        for name, (description, rule) in TrendService.ALERT_RULES.items():
+            breaches = int(rule(recent).sum())
+            if breaches:
+                alerts.append({
+                    "alert": name,
+                    "description": description,
+                    "days": breaches,
+                    "out_of": len(recent)
+                })
+        
+        symptom_streaks = {}
+        for field in SYMPTOM_FIELDS:
+            flags = df[field].to_numpy(dtype=bool)
+            if not flags.any():
+                continue
+            
+            # Run lengths of consecutive True days: reset the count at every False
+            runs = pd.Series(flags).groupby((~pd.Series(flags)).cumsum()).cumsum().to_numpy()
+            symptom_streaks[field.replace("has_", "")] = {
+                "days_with_symptom": int(flags.sum()),
+                "current_streak": int(runs[-1]),
+                "longest_streak": int(runs.max())
+            }
+        
+        return {
+            "days_analyzed": len(df),
+            "period_start": df.index[0].strftime("%Y-%m-%d"),
+            "period_end": df.index[-1].strftime("%Y-%m-%d"),
+            "window_days": window_days,
+            "metrics": metrics,
+            "alerts": alerts,
+            "symptom_streaks": symptom_streaks
+        }
+    
+    
+    @staticmethod
+    def fact_sheet(facts: Dict) -> str:
+        """Render computed facts as a compact text block for prompts"""
+        if not facts.get("days_analyzed"):
+            return "No data."
+        
+        lines = [
+            f"Period: {facts['period_start']} to {facts['period_end']} ({facts['days_analyzed']} days); "
+            f"recent = last {facts['window_days']} days"
+        ]
+        
+        for field, m in facts["metrics"].items():
+            line = f"{field}: latest {m['latest']}, mean {m['mean']}, recent {m['recent_mean']}"
+            if m["change"] is not None:
+                line += f" ({m['change']:+} vs prior)"
+            if m["slope_per_day"] is not None:
+                line += f", slope {m['slope_per_day']:+}/day"
+            lines.append(line)
+        
+        for alert in facts["alerts"]:
+            lines.append(f"ALERT {alert['description']}: {alert['days']}/{alert['out_of']} recent days")
+        
+        for symptom, streak in facts["symptom_streaks"].items():
+            lines.append(
+                f"{symptom}: {streak['days_with_symptom']} days, "
+                f"current streak {streak['current_streak']}, longest {streak['longest_streak']}"
+            )
+        
+        return "\n".join(lines)
@@ -1,14 +1,35 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import time
 from jose import JWTError, jwt
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 from fastapi import HTTPException, status
 
 from app.config import settings
+from app.utils.cache_utils import TTLCache
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Dedicated pool so bcrypt never runs on the event loop
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_pending_password_jobs = 0
+
+# Already-verified token payloads keyed by token digest, expiring with the token
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+# Digest -> exp of tokens revoked before their natural expiry (e.g. on logout), mirroring the
+# revoked_tokens collection. Never evicted to make room: entries leave only once the token expires
+revoked_tokens: Dict[str, float] = {}
+
 
 def hash_password(password: str) -> str:
     """Hash a plain password"""
@@ -20,6 +41,40 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def _run_password_job(func, *args):
+    """Run a bcrypt call in the password pool, rejecting work when saturated"""
+    global _pending_password_jobs
+    
+    if _pending_password_jobs >= settings.PASSWORD_HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy. Please try again shortly.",
+            headers={"Retry-After": "1"},
+        )
+    
+    _pending_password_jobs += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        _pending_password_jobs -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a plain password without blocking the event loop"""
+    return await _run_password_job(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password without blocking the event loop"""
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+def shutdown_password_executor() -> None:
+    """Stop the password worker pool"""
+    password_executor.shutdown(wait=False, cancel_futures=True)
+
+
 def create_access_token(data: Dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -40,20 +95,86 @@ def create_refresh_token(data: Dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     
     return encoded_jwt
 
 
-def verify_token(token: str) -> Dict:
-    """Verify and decode JWT token"""
+def _token_digest(token: str) -> str:
+    """Digest used as cache key so raw tokens are never held in memory"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def verify_token(token: str, allow_expired: bool = False) -> Dict:
+    """Verify and decode JWT token, reusing earlier verifications of the same token"""
+    digest = _token_digest(token)
+    
+    if digest in revoked_tokens:
+        raise _credentials_exception()
+    
+    if allow_expired:
+        # Signature is still checked; expired payloads are never cached
+        try:
+            return jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM],
+                options={"verify_exp": False}
+            )
+        except JWTError:
+            raise _credentials_exception()
+    
+    payload = token_cache.get(digest)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_exception()
+    
+    # Never keep a token cached past its own expiry
+    exp = payload.get("exp")
+    if exp is not None:
+        remaining = exp - time.time()
+        if remaining > 0:
+            token_cache.set(digest, payload, ttl=min(remaining, token_cache.ttl))
+    
+    return payload
+
+
+def revoke_token(token: str) -> Optional[Tuple[str, float]]:
+    """Reject a token in this process for the rest of its lifetime; returns (digest, exp) to share"""
+    digest = _token_digest(token)
+    token_cache.invalidate(digest)
+    
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return None
+    
+    if exp is None or exp <= time.time():
+        return None
+    
+    mark_revoked(digest, exp)
+    return digest, exp
+
+
+def mark_revoked(digest: str, exp: float) -> None:
+    """Reject the token with this digest until exp (a revocation made by any worker)"""
+    token_cache.invalidate(digest)
+    revoked_tokens[digest] = exp
+
+
+def prune_revoked_tokens() -> None:
+    """Forget revocations of tokens that have expired anyway"""
+    now = time.time()
+    for digest in [digest for digest, exp in revoked_tokens.items() if exp <= now]:
+        del revoked_tokens[digest]
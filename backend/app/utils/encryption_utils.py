@@ -1,18 +1,38 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import asyncio
 import base64
+import hashlib
+import hmac
 from app.config import settings
 
+# Workers for encrypting large batches off the event loop
+encryption_executor = ThreadPoolExecutor(
+    max_workers=settings.ENCRYPTION_WORKERS,
+    thread_name_prefix="field-encryption"
+)
 
-def get_cipher():
-    """Get Fernet cipher with encryption key"""
-    # Ensure key is properly formatted (32 bytes base64 encoded)
-    key = settings.ENCRYPTION_KEY.encode()
+
+def _normalize_key(raw_key: str) -> bytes:
+    """Turn a configured key into a Fernet key"""
+    key = raw_key.encode()
     
     # If key is not in base64 format, encode it
     if len(key) < 32:
         key = base64.urlsafe_b64encode(key.ljust(32)[:32])
     
-    return Fernet(key)
+    return key
+
+
+@lru_cache(maxsize=1)
+def get_cipher() -> MultiFernet:
+    """Get the cached cipher (current key first, then retired keys for decryption)"""
+    keys = [settings.ENCRYPTION_KEY]
+    keys.extend(k.strip() for k in settings.ENCRYPTION_OLD_KEYS.split(",") if k.strip())
+    
+    return MultiFernet([Fernet(_normalize_key(k)) for k in keys])
 
 
 def encrypt_data(data: str) -> str:
@@ -35,23 +55,119 @@ def decrypt_data(encrypted_data: str) -> str:
     return decrypted.decode()
 
 
-def encrypt_dict_fields(data_dict: dict, fields_to_encrypt: list) -> dict:
-    """Encrypt specific fields in a dictionary"""
-    encrypted_dict = data_dict.copy()
+def rotate_data(encrypted_data: str) -> str:
+    """Re-encrypt data under the current key"""
+    if not encrypted_data:
+        return encrypted_data
+    
+    cipher = get_cipher()
+    return cipher.rotate(encrypted_data.encode()).decode()
+
+
+@lru_cache(maxsize=1)
+def _blind_index_key() -> bytes:
+    """HMAC key for blind indexes, kept separate from the cipher key"""
+    if settings.BLIND_INDEX_KEY:
+        return settings.BLIND_INDEX_KEY.encode()
+    
+    return hmac.new(settings.ENCRYPTION_KEY.encode(), b"blind-index", hashlib.sha256).digest()
+
+
+def blind_index(value: Optional[str]) -> Optional[str]:
+    """Keyed HMAC of a normalized value, for equality lookups on encrypted fields"""
+    if not value:
+        return None
     
-    for field in fields_to_encrypt:
-        if field in encrypted_dict and encrypted_dict[field]:
-            encrypted_dict[field] = encrypt_data(str(encrypted_dict[field]))
+    normalized = " ".join(str(value).lower().split())
+    return hmac.new(_blind_index_key(), normalized.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def reveal(value: Optional[str]) -> Optional[str]:
+    """Plaintext of a stored value that may be encrypted (values written before encryption are plaintext)"""
+    if not value:
+        return value
     
-    return encrypted_dict
+    try:
+        return decrypt_data(value)
+    except InvalidToken:
+        return value
+
+
+def seal(value: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Encrypt a sensitive value and compute its blind index from the same plaintext"""
+    plaintext = reveal(value)
+    return encrypt_data(plaintext), blind_index(plaintext)
+
+
+def encrypt_dict_fields(data_dict: dict, fields_to_encrypt: list) -> dict:
+    """Encrypt specific fields in a dictionary"""
+    return encrypt_documents([data_dict], fields_to_encrypt)[0]
 
 
 def decrypt_dict_fields(data_dict: dict, fields_to_decrypt: list) -> dict:
     """Decrypt specific fields in a dictionary"""
-    decrypted_dict = data_dict.copy()
+    return decrypt_documents([data_dict], fields_to_decrypt)[0]
+
+
+def encrypt_documents(documents: List[dict], fields: list) -> List[dict]:
+    """Encrypt the given fields across a batch of documents"""
+    encrypt = get_cipher().encrypt
+    results = []
+    
+    for document in documents:
+        encrypted_dict = document.copy()
+        for field in fields:
+            value = encrypted_dict.get(field)
+            if value:
+                encrypted_dict[field] = encrypt(str(value).encode()).decode()
+        results.append(encrypted_dict)
+    
+    return results
+
+
+def decrypt_documents(documents: List[dict], fields: list) -> List[dict]:
+    """Decrypt the given fields across a batch of documents"""
+    decrypt = get_cipher().decrypt
+    results = []
+    
+    for document in documents:
+        decrypted_dict = document.copy()
+        for field in fields:
+            value = decrypted_dict.get(field)
+            if value:
+                decrypted_dict[field] = decrypt(value.encode()).decode()
+        results.append(decrypted_dict)
     
-    for field in fields_to_decrypt:
-        if field in decrypted_dict and decrypted_dict[field]:
-            decrypted_dict[field] = decrypt_data(decrypted_dict[field])
+    return results
+
+
+async def _run_batch(func, documents: List[dict], fields: list, chunk_size: Optional[int]) -> List[dict]:
+    """Run a batch function inline for small batches, or chunked in the worker pool"""
+    chunk_size = chunk_size or settings.ENCRYPTION_OFFLOAD_THRESHOLD
+    
+    if len(documents) < settings.ENCRYPTION_OFFLOAD_THRESHOLD:
+        return func(documents, fields)
     
-    return decrypted_dict
+    loop = asyncio.get_running_loop()
+    chunks = [documents[i:i + chunk_size] for i in range(0, len(documents), chunk_size)]
+    results = await asyncio.gather(*[
+        loop.run_in_executor(encryption_executor, func, chunk, fields)
+        for chunk in chunks
+    ])
+    
+    return [document for chunk in results for document in chunk]
+
+
+async def encrypt_documents_async(documents: List[dict], fields: list, chunk_size: Optional[int] = None) -> List[dict]:
+    """Encrypt a batch of documents, offloading large batches to worker threads"""
+    return await _run_batch(encrypt_documents, documents, fields, chunk_size)
+
+
+async def decrypt_documents_async(documents: List[dict], fields: list, chunk_size: Optional[int] = None) -> List[dict]:
+    """Decrypt a batch of documents, offloading large batches to worker threads"""
+    return await _run_batch(decrypt_documents, documents, fields, chunk_size)
+
+
+def shutdown_encryption_executor() -> None:
+    """Stop the encryption worker pool"""
+    encryption_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,53 @@
+import base64
+import json
+from bson import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime
+from fastapi import HTTPException, status
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def page_limit(limit: int) -> int:
+    """Clamp a page size to 1..PAGE_MAX_LIMIT (Mongo treats limit 0 as no limit)"""
+    return min(max(1, limit), settings.PAGE_MAX_LIMIT)
+
+
+def encode_cursor(sort_value: datetime, document_id: Any) -> str:
+    """Opaque cursor pointing just past a document in (sort field, _id) order"""
+    payload = json.dumps({"v": sort_value.isoformat(), "id": str(document_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Get (sort value, ObjectId) back from a cursor"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(payload["v"]), ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def keyset_filter(field: str, cursor: str) -> Dict:
+    """Mongo filter for documents after the cursor in descending (field, _id) order"""
+    sort_value, document_id = decode_cursor(cursor)
+    
+    return {"$or": [
+        {field: {"$lt": sort_value}},
+        {field: sort_value, "_id": {"$lt": document_id}}
+    ]}
+
+
+def next_cursor(documents: List, field: str, limit: int) -> Optional[str]:
+    """Cursor for the following page, or None when this page is the last"""
+    if not documents or len(documents) < limit:
+        return None
+    
+    last = documents[-1]
+    return encode_cursor(getattr(last, field), last.id)
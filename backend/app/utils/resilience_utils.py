@@ -0,0 +1,101 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.rejected_calls = 0
+        self._probe_in_flight = False
+    
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call is allowed right now"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected_calls += 1
+                raise CircuitOpenError(f"{self.name} is unavailable, failing fast")
+            self.state = self.HALF_OPEN
+        
+        if self.state == self.HALF_OPEN:
+            # Let exactly one probe through to test recovery
+            if self._probe_in_flight:
+                self.rejected_calls += 1
+                raise CircuitOpenError(f"{self.name} is recovering, failing fast")
+            self._probe_in_flight = True
+    
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+    
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+    
+    def release(self) -> None:
+        """Forget an in-flight probe that ended without a verdict (e.g. cancelled)"""
+        self._probe_in_flight = False
+    
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected_calls": self.rejected_calls
+        }
+
+
+def backoff_with_jitter(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff delay for a retry attempt (0-based)"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one shared execution"""
+    
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func, or wait for the identical call already in flight"""
+        self.calls += 1
+        task = self._in_flight.get(key)
+        
+        if task is None:
+            # Run as a task so a cancelled caller does not cancel the shared call
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        
+        return await asyncio.shield(task)
+    
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight)
+        }
@@ -1,13 +1,68 @@
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import List
+from typing import Dict, List, Optional
 
 from app.utils.auth_utils import verify_token
+from app.utils.cache_utils import TTLCache
 from app.models.user_model import User, UserRole
+from app.config import settings
 
 # Security scheme
 security = HTTPBearer()
 
+# Read-only snapshots of authenticated users keyed by user id (saves a DB round trip per request).
+# Every code path that writes to the users collection must call invalidate_cached_user.
+# Invalidation is per process: a deactivation or role change made through another worker
+# is honoured here within USER_CACHE_TTL_SECONDS.
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+# user_id -> [generation, readers] while a cache-miss read of that user is in flight.
+# Invalidation bumps the generation so a read that started before it is never cached.
+_pending_reads: Dict[str, List[int]] = {}
+
+
+def invalidate_cached_user(user_id: str) -> None:
+    """Drop a user from the auth cache after any write to their document"""
+    user_id = str(user_id)
+    user_cache.invalidate(user_id)
+    
+    if user_id in _pending_reads:
+        _pending_reads[user_id][0] += 1
+
+
+def _snapshot(user: User) -> User:
+    """Copy of a user with list fields frozen to tuples, safe to share between requests"""
+    return user.model_copy(update={
+        name: tuple(value) for name, value in user if isinstance(value, list)
+    })
+
+
+async def _load_user(user_id: str) -> Optional[User]:
+    """Read a user from the database, caching it unless it was invalidated meanwhile"""
+    pending = _pending_reads.setdefault(user_id, [0, 0])
+    generation = pending[0]
+    pending[1] += 1
+    
+    try:
+        user = await User.get(user_id)
+    finally:
+        pending[1] -= 1
+        if pending[1] == 0:
+            del _pending_reads[user_id]
+    
+    if user is None:
+        return None
+    
+    snapshot = _snapshot(user)
+    if pending[0] == generation:
+        user_cache.set(user_id, snapshot)
+    
+    return snapshot
+
+
 def require_role(allowed_roles: List[UserRole]):
     """Dependency to check if user has required role"""
     async def role_checker(current_user: User = Depends(get_current_user)) -> User:
@@ -29,13 +84,16 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         payload = verify_token(token)
         user_id: str = payload.get("sub")
         
-        if user_id is None:
+        # Refresh tokens are only accepted by /api/auth/refresh
+        if user_id is None or payload.get("type") == "refresh":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials"
             )
         
-        user = await User.get(user_id)
+        user = user_cache.get(user_id)
+        if user is None:
+            user = await _load_user(user_id)
         
         if user is None:
             raise HTTPException(
@@ -49,7 +107,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
                 detail="User account is inactive"
             )
         
-        return user
+        # Shallow copy: attribute writes stay per request, and the shared lists are immutable tuples
+        return user.model_copy()
         
     except HTTPException:
         raise
@@ -0,0 +1,44 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+
+class PeriodicTask:
+    """Background loop calling an async function every interval seconds"""
+    
+    def __init__(self, name: str, interval: float, func: Callable[[], Awaitable], run_on_stop: bool = False):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_on_stop = run_on_stop
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            
+            try:
+                await self.func()
+            except Exception as e:
+                print(f"Warning: {self.name} failed: {e}")
+    
+    def start(self) -> None:
+        """Start the loop (no-op if already running)"""
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+    
+    async def stop(self) -> None:
+        """Signal the loop to exit and wait for it; never cancels a run in progress"""
+        if self._task is not None:
+            # Cancelling could interrupt func between taking and writing its buffer
+            self._stopping.set()
+            await self._task
+            self._task = None
+        
+        if self.run_on_stop:
+            await self.func()
@@ -0,0 +1,36 @@
+import asyncio
+from typing import Optional
+
+# Set by load_encoding() at startup. tiktoken may download its BPE file on first use,
+# so it is never loaded lazily from a request; until it is ready (or if it can't be
+# loaded offline) count_tokens estimates ~4 characters per token, OpenAI's rule of
+# thumb for English text, rounded up so budgets err on the safe side.
+_encoding = None
+
+
+def _load_encoding():
+    """Load the tiktoken encoding, or None if it is unavailable"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"Warning: tiktoken unavailable, estimating token counts: {e}")
+        return None
+
+
+async def load_encoding() -> Optional[object]:
+    """Load the tokenizer in a worker thread so startup never blocks the event loop"""
+    global _encoding
+    
+    if _encoding is None:
+        _encoding = await asyncio.to_thread(_load_encoding)
+    
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count prompt tokens locally (falls back to ~4 characters per token)"""
+    if _encoding is None:
+        return len(text) // 4 + 1
+    
+    return len(_encoding.encode(text))
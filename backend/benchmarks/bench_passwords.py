@@ -0,0 +1,91 @@
+"""
+Latency of an unrelated route (/health) while logins run, bcrypt inline vs. in the password pool
+
+Run from backend/ with the app's environment (.env): python -m benchmarks.bench_passwords [logins]
+"""
+import asyncio
+import sys
+import time
+
+import httpx
+
+from app.config import settings
+from app.main import app
+from app.utils.auth_utils import hash_password, verify_password, verify_password_async, shutdown_password_executor
+
+PASSWORD = "benchmark-password"
+HASHED = hash_password(PASSWORD)
+
+
+# Stand-ins for /api/auth/login without the database: only the password check differs
+@app.post("/bench/login/inline", include_in_schema=False)
+async def login_inline():
+    return {"ok": verify_password(PASSWORD, HASHED)}
+
+
+@app.post("/bench/login/pool", include_in_schema=False)
+async def login_pool():
+    return {"ok": await verify_password_async(PASSWORD, HASHED)}
+
+
+def percentile(latencies: list, share: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def sample_health(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list, interval: float = 0.01):
+    """Send /health every interval until stopped"""
+    # Latency counts from the scheduled send time, so waiting on a blocked event loop is included
+    async def timed(scheduled: float):
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - scheduled)
+    
+    requests = []
+    scheduled = time.perf_counter()
+    while True:
+        # Catch up on every send that came due while the loop was blocked
+        now = time.perf_counter()
+        while scheduled <= now:
+            requests.append(asyncio.create_task(timed(scheduled)))
+            scheduled += interval
+        
+        if stop.is_set():
+            break
+        await asyncio.sleep(scheduled - now)
+    
+    await asyncio.gather(*requests)
+
+
+async def run(logins: int = 64):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        stop, idle = asyncio.Event(), []
+        sampler = asyncio.create_task(sample_health(client, stop, idle))
+        await asyncio.sleep(1)
+        stop.set()
+        await sampler
+        print(f"{'idle':>7}: /health p50 {percentile(idle, 0.5) * 1000:>8.1f} ms, p99 {percentile(idle, 0.99) * 1000:>8.1f} ms")
+        
+        for mode in ("inline", "pool"):
+            stop, latencies = asyncio.Event(), []
+            sampler = asyncio.create_task(sample_health(client, stop, latencies))
+            
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(client.post(f"/bench/login/{mode}") for _ in range(logins)))
+            elapsed = time.perf_counter() - started
+            
+            stop.set()
+            await sampler
+            assert all(response.status_code == 200 for response in responses)
+            print(
+                f"{mode:>7}: /health p50 {percentile(latencies, 0.5) * 1000:>8.1f} ms, "
+                f"p99 {percentile(latencies, 0.99) * 1000:>8.1f} ms ({len(latencies)} requests) | "
+                f"{logins / elapsed:.1f} logins/s, {logins} concurrent, {settings.PASSWORD_HASH_WORKERS} pool workers"
+            )
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run(*(int(arg) for arg in sys.argv[1:2])))
+    finally:
+        shutdown_password_executor()
@@ -0,0 +1,60 @@
+"""
+Patients risk-scored per second on synthetic logs, for increasing worker counts
+
+Run from backend/ with the app's environment (.env): python -m benchmarks.bench_risk [patients] [days]
+"""
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from bson import ObjectId
+
+from app.config import settings
+from app.services.risk_service import score_batch
+from app.services.trend_service import SYMPTOM_FIELDS
+
+
+def synthetic_batches(patients: int, days: int, rng: np.random.Generator) -> list:
+    batches = []
+    for start in range(0, patients, settings.RISK_BATCH_SIZE):
+        patient_ids = [str(ObjectId()) for _ in range(min(settings.RISK_BATCH_SIZE, patients - start))]
+        rows = len(patient_ids) * days
+        columns = {
+            "temperature": rng.normal(36.9, 0.6, rows),
+            "blood_pressure_systolic": rng.normal(125, 15, rows),
+            "blood_pressure_diastolic": rng.normal(80, 10, rows),
+            "heart_rate": rng.normal(78, 12, rows),
+            "oxygen_saturation": rng.normal(97.5, 1.5, rows),
+            "blood_sugar": rng.normal(110, 35, rows),
+            "sleep_hours": rng.normal(7, 1.2, rows),
+            "stress_level": rng.integers(1, 11, rows).astype(float),
+            "pain_level": rng.integers(0, 5, rows).astype(float),
+            **{field: (rng.random(rows) < 0.1).astype(float) for field in SYMPTOM_FIELDS}
+        }
+        patient_index = np.repeat(np.arange(len(patient_ids)), days)
+        day_index = np.tile(np.arange(days), len(patient_ids))
+        batches.append((patient_ids, patient_index, day_index, columns))
+    
+    return batches
+
+
+def run(patients: int = 5000, days: int = 30):
+    batches = synthetic_batches(patients, days, np.random.default_rng(0))
+    
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            list(pool.map(score_batch, *zip(*batches[:workers])))  # Start the workers before timing
+            started = time.perf_counter()
+            list(pool.map(score_batch, *zip(*batches)))
+            elapsed = time.perf_counter() - started
+        
+        print(f"{workers:>3} worker(s): {patients / elapsed:>10.0f} patients/s ({patients} patients x {days} days)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,27 @@
+"""
+Token verifications per second with and without the verified-payload cache
+
+Run from backend/ with the app's environment (.env): python -m benchmarks.bench_tokens [verifications]
+"""
+import sys
+import time
+
+from app.utils.auth_utils import create_access_token, verify_token, token_cache
+
+
+def run(verifications: int = 100000):
+    tokens = [create_access_token({"sub": str(i), "role": "patient"}) for i in range(100)]
+    
+    for label, clear_cache in (("uncached", True), ("cached", False)):
+        token_cache.clear()
+        started = time.perf_counter()
+        for i in range(verifications):
+            if clear_cache:
+                token_cache.clear()
+            verify_token(tokens[i % len(tokens)])
+        elapsed = time.perf_counter() - started
+        print(f"{label:>8}: {verifications / elapsed:>10.0f} verifications/s ({elapsed / verifications * 1e6:.1f} us each)")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,14 @@
+import os
+from pathlib import Path
+
+# Settings are read at import time; give the app a throwaway environment
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DATABASE_NAME", "phr_test")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ENCRYPTION_KEY", "dGVzdC1lbmNyeXB0aW9uLWtleS0zMi1ieXRlcyEhISE=")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("ADMIN_EMAIL", "admin@example.com")
+os.environ.setdefault("ADMIN_PASSWORD", "admin-password")
+
+# app.main mounts app/static, which is not tracked in git
+(Path(__file__).resolve().parent.parent / "app" / "static").mkdir(exist_ok=True)
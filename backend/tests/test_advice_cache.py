@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.advice_cache_service import AdviceCacheService
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(AdviceCacheService, "_entries", {})
+    monkeypatch.setattr(AdviceCacheService, "_indexes", {})
+
+
+def _cache(*symptoms, severity="mild"):
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    for symptom in symptoms:
+        AdviceCacheService._remember(AdviceCacheService.normalize_symptom(symptom), severity, f"advice for {symptom}", expires_at)
+
+
+@pytest.mark.parametrize("query, cached", [
+    ("cough with blood", "cough"),
+    ("blood cough", "cough"),
+    ("no fever", "fever"),
+    ("left chest pain", "chest pain"),
+])
+def test_extra_words_and_negation_never_reuse_advice(query, cached):
+    _cache(cached, "headache", "sore throat", "back pain")
+    
+    assert AdviceCacheService.lookup(query, "mild") is None
+
+
+@pytest.mark.parametrize("query, cached", [
+    ("headaches", "headache"),
+    ("I have a bad headache", "headache"),
+    ("throat sore", "sore throat"),
+    ("chest pains", "chest pain"),
+    ("no fever", "no fever"),
+])
+def test_rephrasings_reuse_advice(query, cached):
+    _cache(cached, "cough", "back pain", "fever")
+    
+    assert AdviceCacheService.lookup(query, "mild") == f"advice for {cached}"
+
+
+def test_severity_is_part_of_the_key():
+    _cache("headache", severity="mild")
+    
+    assert AdviceCacheService.lookup("headache", "severe") is None
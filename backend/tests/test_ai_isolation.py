@@ -0,0 +1,95 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.main import app
+from app.services import llm_provider
+from app.services.ai_service import AIService
+from app.services.telemetry_service import LLMTelemetryService
+
+STUB_LATENCY_SECONDS = 0.5
+IN_FLIGHT_CALLS = 50
+
+
+class SlowCompletions:
+    """Stands in for AsyncOpenAI.chat.completions with a slow provider"""
+    
+    def __init__(self):
+        self.started = 0
+    
+    async def create(self, **request):
+        self.started += 1
+        await asyncio.sleep(STUB_LATENCY_SECONDS)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=2)
+        )
+
+
+async def _health_p95(client: httpx.AsyncClient, requests: int = 40) -> float:
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get("/health")
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    
+    latencies.sort()
+    return latencies[int(len(latencies) * 0.95) - 1]
+
+
+def _install_slow_stub(monkeypatch, route: str) -> SlowCompletions:
+    completions = SlowCompletions()
+    stub_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setitem(llm_provider.PROVIDERS, "slow-stub", lambda: stub_client)
+    monkeypatch.setitem(llm_provider._clients, "slow-stub", stub_client)
+    monkeypatch.setitem(settings.AI_ROUTE_MODELS, route, "slow-stub:stub-model")
+    return completions
+
+
+@pytest.mark.asyncio
+async def test_health_stays_fast_with_slow_ai_calls_in_flight(monkeypatch):
+    completions = _install_slow_stub(monkeypatch, "isolation-test")
+    
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        baseline_p95 = await _health_p95(client)
+        
+        calls = [
+            asyncio.create_task(AIService._complete("isolation-test", messages=[{"role": "user", "content": "hi"}]))
+            for _ in range(IN_FLIGHT_CALLS)
+        ]
+        await asyncio.sleep(0.05)
+        
+        loaded_p95 = await _health_p95(client)
+        in_flight = sum(not call.done() for call in calls)
+        
+        responses = await asyncio.gather(*calls)
+    
+    assert completions.started > 0
+    assert in_flight == IN_FLIGHT_CALLS
+    assert all(response.choices[0].message.content == "ok" for response in responses)
+    # A blocked event loop would push /health to the stub's latency
+    assert loaded_p95 < max(baseline_p95 * 5, 0.05)
+    assert loaded_p95 < STUB_LATENCY_SECONDS / 10
+
+
+@pytest.mark.asyncio
+async def test_cancelled_completion_is_recorded_as_aborted(monkeypatch):
+    _install_slow_stub(monkeypatch, "cancel-test")
+    monkeypatch.setattr(LLMTelemetryService, "_buckets", {})
+    
+    call = asyncio.create_task(AIService._complete("cancel-test", messages=[{"role": "user", "content": "hi"}]))
+    await asyncio.sleep(0.05)
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    
+    buckets = [bucket for key, bucket in LLMTelemetryService._buckets.items() if key[1] == "cancel-test"]
+    assert len(buckets) == 1
+    assert buckets[0]["calls"] == 1
+    assert buckets[0]["aborted"] == 1
+    assert buckets[0]["errors"] == 0
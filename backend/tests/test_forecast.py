@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.forecast_service import ForecastService, FORECAST_FIELDS
+
+ORIGIN = datetime(2021, 1, 1)
+
+
+def _logs(days, values, field="weight"):
+    return [
+        SimpleNamespace(log_date=ORIGIN + timedelta(days=float(day)), **{**dict.fromkeys(FORECAST_FIELDS), field: float(value)})
+        for day, value in zip(days, values)
+    ]
+
+
+def _state():
+    return {"origin": ORIGIN, "trained_until": None, "stats": {}}
+
+
+def test_incremental_sums_match_batch_least_squares_over_years():
+    rng = np.random.default_rng(0)
+    days = np.sort(rng.uniform(0, 5 * 365, 3000))
+    values = 80 - 0.004 * days + rng.normal(0, 0.8, len(days))
+    
+    state = _state()
+    for chunk in np.array_split(np.arange(len(days)), 25):
+        ForecastService._train(state, _logs(days[chunk], values[chunk]))
+    
+    intercept, slope, std, _, _ = ForecastService._fit(state["stats"]["weight"], min_spread=0.0)
+    expected_slope, expected_intercept = np.polyfit(days, values, 1)
+    
+    assert slope == pytest.approx(expected_slope, rel=1e-6)
+    assert intercept == pytest.approx(expected_intercept, rel=1e-6)
+    assert std == pytest.approx(0.8, rel=0.1)
+
+
+def test_single_day_of_logs_forecasts_the_mean():
+    state = _state()
+    ForecastService._train(state, _logs([3, 3, 3, 3, 3], [70, 71, 72, 73, 74]))
+    
+    intercept, slope, _, _, _ = ForecastService._fit(state["stats"]["weight"], FORECAST_FIELDS["weight"])
+    
+    assert slope == 0.0
+    assert intercept == pytest.approx(72)
@@ -19,11 +19,14 @@ export const AuthProvider = ({ children }) => {
     setLoading(false)
   }, [])
 
-  const login = (userData, accessToken) => {
+  const login = (userData, accessToken, refreshToken) => {
     setUser(userData)
     setToken(accessToken)
     localStorage.setItem('user', JSON.stringify(userData))
     localStorage.setItem('token', accessToken)
+    if (refreshToken) {
+      localStorage.setItem('refresh_token', refreshToken)
+    }
   }
 
   const logout = () => {
@@ -31,6 +34,7 @@ export const AuthProvider = ({ children }) => {
     setToken(null)
     localStorage.removeItem('user')
     localStorage.removeItem('token')
+    localStorage.removeItem('refresh_token')
   }
 
   const updateUser = (userData) => {
@@ -4,12 +4,15 @@ import Navbar from '../components/Navbar'
 import LoadingSpinner from '../components/LoadingSpinner'
 import api from '../services/api'
 
+const SAVED_INSIGHTS_PAGE_SIZE = 20
+
 export default function Insights() {
   const { user } = useAuth()
   const [logs, setLogs] = useState([])
   const [selectedLogs, setSelectedLogs] = useState([])
   const [insight, setInsight] = useState(null)
   const [savedInsights, setSavedInsights] = useState([])
+  const [savedCursor, setSavedCursor] = useState(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
   const [isFromDatabase, setIsFromDatabase] = useState(false)
@@ -28,10 +31,14 @@ export default function Insights() {
     }
   }
 
-  const fetchSavedInsights = async () => {
+  const fetchSavedInsights = async (cursor = null) => {
     try {
-      const response = await api.get('/api/ai/saved-insights')
-      setSavedInsights(response.data.insights || [])
+      const params = { limit: SAVED_INSIGHTS_PAGE_SIZE, ...(cursor ? { cursor } : {}) }
+      const response = await api.get('/api/ai/saved-insights', { params })
+      const page = response.data.insights || []
+      // A cursor means "load more": append to what is already shown
+      setSavedInsights(previous => cursor ? [...previous, ...page] : page)
+      setSavedCursor(response.headers['x-next-cursor'] || null)
     } catch (error) {
       console.error('Error fetching saved insights:', error)
     }
@@ -92,8 +99,8 @@ export default function Insights() {
       // Use the main insights endpoint
       const response = await api.get('/api/ai/insights?days=365')
       
-      // Parse insights
-      const parsedInsights = parseInsights(response.data.insights)
+      // Prefer the server-validated structure; fall back to parsing the raw text
+      const parsedInsights = response.data.structured || parseInsights(response.data.insights)
       
       // Enhance with selected logs info
       const enhancedData = {
@@ -107,8 +114,12 @@ export default function Insights() {
       setInsight(enhancedData)
       setIsFromDatabase(false) // Mark as newly generated from AI
       
-      // Auto-save the insight
-      await saveInsightToDB(enhancedData)
+      // The server saves insights it generates; only save when it didn't
+      if (response.data.insight_id) {
+        fetchSavedInsights()
+      } else if (!response.data.error) {
+        await saveInsightToDB(enhancedData)
+      }
     } catch (error) {
       setError('Failed to generate insight: ' + (error.response?.data?.detail || 'Please try again.'))
       console.error('Error generating insight:', error)
@@ -244,6 +255,23 @@ export default function Insights() {
                 </div>
               ))}
             </div>
+            {savedCursor && (
+              <button
+                onClick={() => fetchSavedInsights(savedCursor)}
+                style={{
+                  marginTop: '16px',
+                  background: 'white',
+                  color: '#14b8a6',
+                  border: '1px solid #14b8a6',
+                  padding: '8px 16px',
+                  borderRadius: '8px',
+                  cursor: 'pointer',
+                  fontSize: '14px'
+                }}
+              >
+                Load more
+              </button>
+            )}
           </div>
         )}
 
@@ -19,7 +19,7 @@ export default function Login() {
 
     try {
       const data = await authService.login(email, password)
-      login(data.user, data.access_token)
+      login(data.user, data.access_token, data.refresh_token)
       navigate('/dashboard')
     } catch (err) {
       setError(err.response?.data?.detail || 'Login failed')
@@ -23,7 +23,7 @@ export default function Register() {
 
     try {
       const data = await authService.register(formData);
-      login(data.user, data.access_token);
+      login(data.user, data.access_token, data.refresh_token);
       navigate("/dashboard");
     } catch (err) {
       setError(err.response?.data?.detail || "Registration failed");
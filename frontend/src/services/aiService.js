@@ -19,10 +19,10 @@ export const aiService = {
     return response.data
   },
 
-  async chat(message, conversationHistory = null) {
+  async chat(message, sessionId = null) {
     const response = await api.post('/api/ai/chat', {
       message,
-      conversation_history: conversationHistory
+      session_id: sessionId
     })
     return response.data
   },
@@ -19,13 +19,60 @@ api.interceptors.request.use(
   }
 );
 
+// One refresh at a time: concurrent 401s wait on the same rotation instead of
+// replaying the old refresh token, which the server treats as reuse
+let refreshPromise = null;
+
+const refreshAccessToken = (refreshToken) => {
+  if (!refreshPromise) {
+    refreshPromise = api
+      .post('/api/auth/refresh', { refresh_token: refreshToken })
+      .then(({ data }) => {
+        localStorage.setItem('token', data.access_token);
+        localStorage.setItem('refresh_token', data.refresh_token);
+        return data.access_token;
+      })
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
 // Handle authentication errors
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config;
+    const refreshToken = localStorage.getItem('refresh_token');
+
+    // Renew an expired access token once before giving up
+    if (
+      error.response?.status === 401 &&
+      refreshToken &&
+      original &&
+      !original._retry &&
+      !original.url?.includes('/api/auth/refresh')
+    ) {
+      original._retry = true;
+      try {
+        // A refresh that finished after this request was sent already has a fresh token
+        const current = localStorage.getItem('token');
+        const accessToken =
+          current && original.headers.Authorization !== `Bearer ${current}`
+            ? current
+            : await refreshAccessToken(refreshToken);
+        original.headers.Authorization = `Bearer ${accessToken}`;
+        return api(original);
+      } catch (refreshError) {
+        // Fall through to logout below
+      }
+    }
+
     if (error.response?.status === 401 || error.response?.status === 403) {
       // Clear auth data
       localStorage.removeItem('token');
+      localStorage.removeItem('refresh_token');
       localStorage.removeItem('user');
       // Redirect to login
       window.location.href = '/login';
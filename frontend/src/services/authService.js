@@ -27,6 +27,7 @@ export const authService = {
   },
 
   async logout() {
-    await api.post('/api/auth/logout')
+    const refreshToken = localStorage.getItem('refresh_token')
+    await api.post('/api/auth/logout', refreshToken ? { refresh_token: refreshToken } : undefined)
   }
 }